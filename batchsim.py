@@ -0,0 +1,258 @@
+"""
+Lockstep batch simulation of dominusNonKillProb's targeting, for sweeping
+over many games at once without a Player per game.
+
+The boards of N games are held as stacked arrays, and each step every
+game still going takes one shot:
+- at the first empty neighbour of the latest hit that has one, or
+- failing that, at the first cell (in placements.CELLS order) of highest
+  density, where the density of every board is counted at once as two
+  matrix products over a density.DensityTable, the same counts
+  density.count (and so countPossibilities) gives.
+
+That is exactly what dominusNonKillProb.Player.chooseMove does, so
+validate() plays both on the same layouts and compares them. Layouts are
+drawn from a pool sampled up front, as sampling is much slower than
+playing. Needs NumPy.
+
+Usage: python batchsim.py --games 100000 [--validate 200]
+"""
+import argparse
+import collections
+import math
+import random
+import time
+
+import numpy
+
+import match # Sets up const and base_player when the manager isn't around
+import const
+import bitboard
+import density
+import deployment
+import geometry
+import placements
+
+CELL_COUNT = len(placements.CELLS)
+FLEET_SIZE = 21
+MAX_SHOTS = CELL_COUNT
+
+# Neighbours of each cell as indices into placements.CELLS, padded with
+# CELL_COUNT, an extra column that is always filled
+NEIGHBOURS = numpy.full((CELL_COUNT, 4), CELL_COUNT, dtype=numpy.intp)
+for _i, _cell in enumerate(placements.CELLS):
+    for _k, _n in enumerate(geometry.NEIGHBOURS[_cell]):
+        NEIGHBOURS[_i, _k] = density.CELL_INDEX[_n]
+
+_arrays = {}
+
+Summary = collections.namedtuple("Summary", ["games", "stalled", "mean", "std", "percentiles"])
+
+def countBatch(table, filled, active=None):
+    """
+    Count the density of each of a stack of boards.
+    Returns an N x cells array of counts, in placements.CELLS order.
+
+    Keyword arguments:
+    table -- density.DensityTable to count over
+    filled -- N x cells array, nonzero where a cell is no longer empty
+    active -- which of table.shipTypes are still in play (default: all)
+    """
+    try:
+        occupancy, credits, typeIndex = _arrays[table]
+    except KeyError:
+        occupancy, credits, typeIndex = table.arrays()
+        # float32 products go through BLAS; every count fits exactly
+        occupancy = numpy.ascontiguousarray(occupancy.T, dtype=numpy.float32)
+        credits = credits.astype(numpy.float32)
+        _arrays[table] = occupancy, credits, typeIndex
+    live = numpy.asarray(filled, dtype=numpy.float32).dot(occupancy) == 0
+    if active is not None:
+        live &= numpy.array([shipType in active for shipType in table.shipTypes])[typeIndex]
+    return live.astype(numpy.float32).dot(credits).astype(numpy.int64)
+
+def nonKillProbTable():
+    import dominusNonKillProb
+    return dominusNonKillProb.Player().densityTable()
+
+def layoutPool(size, touching=False, rng=random):
+    """
+    Sample size fleets the way dominus deploys them, as a size x cells
+    array that is True on every ship cell.
+    """
+    import dominus
+    pool = numpy.zeros((size, CELL_COUNT), dtype=bool)
+    for i in range(size):
+        for placement in deployment.sampleFleet(dominus.Player.catalog, touching=touching,
+                                                rng=rng):
+            for cell in placement.cells:
+                pool[i, density.CELL_INDEX[cell]] = True
+    return pool
+
+def simulate(table, layouts):
+    """
+    Play one game against each layout (a row of an N x cells array,
+    True on ship cells), all in lockstep. Returns the number of shots
+    each game took to sink every ship, or -1 for games that ran out of
+    cells to shoot at first, as dominusNonKillProb can.
+    """
+    layouts = numpy.asarray(layouts, dtype=bool)
+    games = len(layouts)
+    rows = numpy.arange(games)
+    # One extra column, always filled, for NEIGHBOURS padding
+    filled = numpy.zeros((games, CELL_COUNT + 1), dtype=bool)
+    filled[:, CELL_COUNT] = True
+    hit_time = numpy.full((games, CELL_COUNT), -1, dtype=numpy.int32)
+    hits = numpy.zeros(games, dtype=numpy.int32)
+    shots = numpy.full(games, -1, dtype=numpy.int32)
+    playing = numpy.ones(games, dtype=bool)
+
+    for step in range(MAX_SHOTS):
+        index = rows[playing]
+        if not len(index):
+            break
+        board = filled[index]
+
+        # Latest hit with an empty neighbour, and its first empty neighbour
+        empty_neighbours = ~board[:, NEIGHBOURS]
+        times = numpy.where(empty_neighbours.any(axis=2), hit_time[index], -1)
+        latest = times.argmax(axis=1)
+        targeting = times[numpy.arange(len(index)), latest] >= 0
+        first = empty_neighbours[numpy.arange(len(index)), latest].argmax(axis=1)
+        move = NEIGHBOURS[latest, first]
+
+        hunting = ~targeting
+        if hunting.any():
+            counts = countBatch(table, board[hunting, :CELL_COUNT])
+            # argmax takes the first of equal counts, in CELLS order
+            best = counts.argmax(axis=1)
+            stalled = counts[numpy.arange(len(best)), best] == 0
+            move[hunting] = best
+            if stalled.any():
+                done = index[hunting][stalled]
+                playing[done] = False
+                move[hunting.nonzero()[0][stalled]] = CELL_COUNT
+
+        shooting = move < CELL_COUNT
+        index, move = index[shooting], move[shooting]
+        filled[index, move] = True
+        hit = layouts[index, move]
+        hit_time[index[hit], move[hit]] = step
+        hits[index[hit]] += 1
+        won = index[hits[index] == FLEET_SIZE]
+        shots[won] = step + 1
+        playing[won] = False
+    return shots
+
+def playPlayer(module, layout):
+    """
+    Play one game with a Player from module against layout, driving it as
+    simulate does. Returns the shots it took, or -1 if it stalled.
+    """
+    import importlib
+    player = importlib.import_module(module).getPlayer()
+    player.newPlayer("batchsim")
+    player.newRound()
+    player.deployFleet()
+    hits = 0
+    for shot in range(MAX_SHOTS):
+        move = tuple(player.chooseMove())
+        if (move not in density.CELL_INDEX or
+                player._opponenBoard[move[0]][move[1]] != const.EMPTY):
+            return -1
+        hit = layout[density.CELL_INDEX[move]]
+        player.setOutcome(const.HIT if hit else const.MISSED, move[0], move[1])
+        hits += bool(hit)
+        if hits == FLEET_SIZE:
+            return shot + 1
+    return -1
+
+def summarise(shots):
+    shots = numpy.asarray(shots)
+    finished = shots[shots >= 0]
+    if not len(finished):
+        return Summary(len(shots), len(shots), None, None, None)
+    return Summary(len(shots), int((shots < 0).sum()), float(finished.mean()),
+                   float(finished.std()),
+                   dict((p, float(numpy.percentile(finished, p))) for p in (10, 50, 90)))
+
+def ksStatistic(a, b):
+    """
+    Get the two-sample Kolmogorov-Smirnov statistic of a and b, and the
+    value it would have to pass to reject their being alike at the 1% level.
+    """
+    a, b = numpy.sort(a), numpy.sort(b)
+    values = numpy.concatenate([a, b])
+    cdf_a = numpy.searchsorted(a, values, side="right") / float(len(a))
+    cdf_b = numpy.searchsorted(b, values, side="right") / float(len(b))
+    critical = 1.63 * math.sqrt(float(len(a) + len(b)) / (len(a) * len(b)))
+    return float(numpy.abs(cdf_a - cdf_b).max()), critical
+
+def validate(games, seed=0, touching=False):
+    """
+    Play games games both in simulate and with dominusNonKillProb Players
+    on the same layouts. Returns the fraction of games where both took the
+    same number of shots, the KS statistic of the two sets of shots and its
+    1% critical value, and the Summary of each.
+    """
+    layouts = layoutPool(games, touching, random.Random(seed))
+    batch = simulate(nonKillProbTable(), layouts)
+    single = numpy.array([playPlayer("dominusNonKillProb", layout) for layout in layouts])
+
+    # The kernel should give density.count's counts exactly, board by board
+    rng = numpy.random.RandomState(seed)
+    boards = rng.rand(games, CELL_COUNT) < rng.rand(games, 1)
+    table = nonKillProbTable()
+    counted = countBatch(table, boards)
+    for board, counts in zip(boards, counted):
+        filled = bitboard.cellMask(placements.CELLS[i] for i in numpy.flatnonzero(board))
+        if list(counts) != density.count(table, table.shipTypes, filled)[1]:
+            raise AssertionError("countBatch disagrees with density.count")
+
+    agree = float((batch == single).mean())
+    statistic, critical = ksStatistic(batch[batch >= 0], single[single >= 0])
+    return agree, statistic, critical, summarise(batch), summarise(single)
+
+def run(games, batch_size, pool_size, seed=0, touching=False):
+    """
+    Play games games against layouts drawn from a pool of pool_size,
+    batch_size at a time. Returns the shots of every game.
+    """
+    rng = random.Random(seed)
+    pool = layoutPool(pool_size, touching, rng)
+    table = nonKillProbTable()
+    picker = numpy.random.RandomState(seed)
+    shots = []
+    for start in range(0, games, batch_size):
+        count = min(batch_size, games - start)
+        shots.append(simulate(table, pool[picker.randint(len(pool), size=count)]))
+    return numpy.concatenate(shots)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many games of dominusNonKillProb at once.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=2000, help="games to play at once")
+    parser.add_argument("--pool", type=int, default=5000, help="layouts to draw games from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--touching", action="store_true", help="let ships in layouts touch")
+    parser.add_argument("--validate", type=int, default=0, metavar="GAMES",
+                        help="compare GAMES games against Players instead")
+    args = parser.parse_args(argv)
+
+    if args.validate:
+        agree, statistic, critical, batch, single = validate(args.validate, args.seed,
+                                                             args.touching)
+        print "batch:  %s" % (batch,)
+        print "player: %s" % (single,)
+        print "same shots in %.1f%% of games, KS %.4f (1%% critical %.4f): %s" % (
+            100 * agree, statistic, critical, "ok" if statistic < critical else "DIFFERENT")
+        return
+
+    start = time.time()
+    shots = run(args.games, args.batch, args.pool, args.seed, args.touching)
+    elapsed = time.time() - start
+    print summarise(shots)
+    print "%d games in %.1fs (%.0f games/s)" % (len(shots), elapsed, len(shots) / elapsed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Microbenchmarks for the targeting hot paths of every player module.
+
+Each function is timed call by call against a corpus of fixture board
+states, reporting latency percentiles and the net number of GC-tracked
+objects each call leaves allocated. --json writes the same figures in
+machine-readable form, for comparing one version against another.
+--memory instead measures how much memory each live player holds, each
+module in a process of its own.
+
+Usage: python bench.py [--json out.json] [--modules dominus ...] [--functions panicAttack ...]
+       python bench.py --memory 2000 [--modules dominus ...]
+"""
+import argparse
+import collections
+import gc
+import importlib
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import timeit
+
+import match # Sets up const and base_player when the manager isn't around
+import const
+import density
+import geometry
+import placements
+
+MODULES = ["dominus", "dominusAdjacent", "dominusFloodFill", "dominusNonKillProb",
+           "dominusNonProbablistic", "dominusWallpaper"]
+
+Fixture = collections.namedtuple("Fixture", ["name", "shots", "region", "border"])
+
+###### Fixtures ######
+
+def randomFleet(rng, touching=False):
+    """
+    Get a random legal fleet as a list of placements. With touching, each
+    ship is placed next to the ones before it wherever it can be.
+    """
+    dominus = importlib.import_module("dominus")
+    catalog = placements.getCatalog(dominus.Player().allshapes.items(),
+                                    dominus.Player.getRotationFactor)
+    fleet = []
+    occupied = set()
+    for shipType in catalog.shipTypes:
+        options = [p for p in catalog.placements
+                   if p.shipType == shipType and not p.cellSet & occupied]
+        if touching and fleet:
+            options = [p for p in options if any(n in occupied for c in p.cells
+                                                 for n in geometry.neighbours(c))] or options
+        placement = rng.choice(options)
+        fleet.append(placement)
+        occupied |= placement.cellSet
+    return fleet
+
+def makeFixture(name, fleet, shots):
+    """
+    Build a fixture from the shots taken at a fleet. region is the largest
+    connected group of hits and border the unshot cells next to it.
+    """
+    occupied = set(c for p in fleet for c in p.cells)
+    shots = [(cell, const.HIT if cell in occupied else const.MISSED) for cell in shots]
+    hits = set(cell for cell, outcome in shots if outcome == const.HIT)
+    shot = set(cell for cell, _ in shots)
+
+    region = set()
+    unseen = set(hits)
+    while unseen:
+        group = set()
+        stack = [min(unseen)]
+        while stack:
+            cell = stack.pop()
+            if cell in unseen:
+                unseen.discard(cell)
+                group.add(cell)
+                stack.extend(geometry.neighbours(cell))
+        if len(group) > len(region):
+            region = group
+    border = set(n for c in region for n in geometry.neighbours(c) if n not in shot)
+    return Fixture(name, shots, region, border)
+
+def fixtures():
+    """
+    The fixture corpus:
+    empty    -- nothing shot yet
+    midgame  -- a third of the board shot at random
+    touching -- two ships placed against each other, both sunk
+    panic    -- a fleet of touching ships with every cell but one of each hit
+    """
+    rng = random.Random(0)
+    corpus = [makeFixture("empty", randomFleet(rng), [])]
+
+    fleet = randomFleet(rng)
+    corpus.append(makeFixture("midgame", fleet, rng.sample(placements.CELLS, 36)))
+
+    fleet = randomFleet(rng, touching=True)
+    shots = [c for p in fleet[:2] for c in p.cells]
+    shots += [c for c in rng.sample(placements.CELLS, 20) if c not in shots]
+    corpus.append(makeFixture("touching", fleet, shots))
+
+    fleet = randomFleet(rng, touching=True)
+    shots = [c for p in fleet for c in p.cells[:-1]]
+    corpus.append(makeFixture("panic", fleet, shots))
+    return corpus
+
+def setUp(module, fixture):
+    """
+    Get a player from module that has taken the shots of fixture.
+    """
+    random.seed(0)
+    player = importlib.import_module(module).getPlayer()
+    player.newPlayer("Benchmark")
+    player.newRound()
+    player.deployFleet()
+    for (row, col), outcome in fixture.shots:
+        player.setOutcome(outcome, row, col)
+    return player
+
+###### Cases ######
+# Each case gets the calls to time for a player in a fixture, as a list of
+# argument tuples, or None if the player has nothing to time.
+
+def caseCalcPossibilities(player, fixture):
+    return [()]
+
+def caseCalcHitProbabilities(player, fixture):
+    if fixture.region:
+        return [(set(fixture.region),)]
+
+def casePanicAttack(player, fixture):
+    if fixture.region:
+        player.panicInit()
+        return [(set(), set(player.hit_regions[0]), player.shapes)]
+
+def caseCountPossibilities(player, fixture):
+    if player.density is None:
+        return None
+    return [(cell, shipType) for shipType in player.shapes for cell in placements.CELLS]
+
+def caseCover(player, fixture):
+    if fixture.region:
+        return [(set(fixture.region), set(fixture.border))]
+
+def caseAnalyzeHitRegion(player, fixture):
+    if not fixture.region:
+        return None
+    return [(set(fixture.region), list(player.shapes))]
+
+CASES = collections.OrderedDict([
+    ("calcPossibilities", caseCalcPossibilities),
+    ("calcHitProbabilities", caseCalcHitProbabilities),
+    ("panicAttack", casePanicAttack),
+    ("countPossibilities", caseCountPossibilities),
+    ("coverWithSingleShip", caseCover),
+    ("coverWithMultipleShips", caseCover),
+    ("analyzeHitRegion", caseAnalyzeHitRegion),
+])
+
+###### Timing ######
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def timeCalls(function, calls, repeat, max_seconds):
+    """
+    Time each call of function, repeat times over, stopping early once
+    max_seconds have been spent (after at least one call).
+    Returns the per-call times in seconds and allocations, and how many
+    calls raised.
+    """
+    times = []
+    allocs = []
+    errors = 0
+    spent = 0.0
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for args in calls:
+                before = gc.get_count()[0]
+                start = timeit.default_timer()
+                try:
+                    function(*args)
+                except Exception:
+                    errors += 1
+                elapsed = timeit.default_timer() - start
+                allocs.append(gc.get_count()[0] - before)
+                times.append(elapsed)
+                spent += elapsed
+                if spent > max_seconds:
+                    return times, allocs, errors
+            gc.collect()
+    finally:
+        gc.enable()
+    return times, allocs, errors
+
+def benchmark(modules, functions, fixture_names=None, repeat=20, max_seconds=2.0):
+    """
+    Generator for a result dict for every (module, function, fixture)
+    the module has the function for.
+    """
+    for fixture in fixtures():
+        if fixture_names and fixture.name not in fixture_names:
+            continue
+        for module in modules:
+            for name in functions:
+                player = setUp(module, fixture)
+                if not hasattr(player, name):
+                    continue
+                calls = CASES[name](player, fixture)
+                if not calls:
+                    continue
+                times, allocs, errors = timeCalls(getattr(player, name), calls,
+                                                  repeat, max_seconds)
+                times.sort()
+                yield collections.OrderedDict([
+                    ("module", module),
+                    ("function", name),
+                    ("fixture", fixture.name),
+                    ("calls", len(times)),
+                    ("errors", errors),
+                    ("mean_us", 1e6 * sum(times) / len(times)),
+                    ("p50_us", 1e6 * percentile(times, 0.5)),
+                    ("p90_us", 1e6 * percentile(times, 0.9)),
+                    ("p99_us", 1e6 * percentile(times, 0.99)),
+                    ("max_us", 1e6 * times[-1]),
+                    ("allocs_per_call", float(sum(allocs)) / len(allocs)),
+                ])
+
+###### Memory ######
+
+def residentBytes():
+    """
+    Get the resident set size of this process, or None where /proc isn't
+    there to ask.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (IOError, OSError):
+        return None
+
+def memoryPerPlayer(module, fixture, players=2000):
+    """
+    Get the bytes each live player from module takes up once it has taken
+    the shots of fixture and chosen a move, averaged over players players
+    held at once, or None if residentBytes can't be measured or didn't
+    grow. The resident set never shrinks, so each module wants a process
+    of its own (see memoryInSubprocess).
+    """
+    # One player first, so the tables every player shares are already built
+    setUp(module, fixture).chooseMove()
+    gc.collect()
+    before = residentBytes()
+    if before is None:
+        return None
+    live = []
+    for _ in range(players):
+        player = setUp(module, fixture)
+        if hasattr(player, "move_deadline"):
+            player.move_deadline = None
+        player.chooseMove()
+        live.append(player)
+    gc.collect()
+    used = residentBytes() - before
+    if used <= 0:
+        return None
+    return float(used) / players
+
+def memoryInSubprocess(module, fixture, players=2000):
+    """
+    memoryPerPlayer, run in a fresh interpreter so nothing an earlier
+    module allocated is counted, or counted against, this one.
+    """
+    output = subprocess.check_output([sys.executable, __file__, "--memory", str(players),
+                                      "--modules", module, "--fixtures", fixture.name])
+    used = output.split()[1]
+    return None if used == "can't" else float(used)
+
+def metadata():
+    try:
+        revision = subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                           stderr=subprocess.STDOUT).strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return collections.OrderedDict([
+        ("revision", revision),
+        ("python", platform.python_version()),
+        ("implementation", platform.python_implementation()),
+        ("numpy", density.USE_NUMPY and density.numpy is not None),
+    ])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the targeting hot paths.")
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--functions", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--fixtures", nargs="+", default=None)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-seconds", type=float, default=2.0,
+                        help="time spent on any one function and fixture before moving on")
+    parser.add_argument("--json", default=None, metavar="FILE", help="also write results to FILE")
+    parser.add_argument("--memory", type=int, default=0, metavar="PLAYERS",
+                        help="measure the memory of PLAYERS live players instead")
+    args = parser.parse_args(argv)
+
+    if args.memory:
+        fixture = [f for f in fixtures() if f.name in (args.fixtures or ["midgame"])][0]
+        measure = memoryPerPlayer if len(args.modules) == 1 else memoryInSubprocess
+        for module in args.modules:
+            used = measure(module, fixture, args.memory)
+            print "%-24s %s" % (module, "%.0f bytes per player" % used
+                                if used is not None else "can't measure")
+            sys.stdout.flush()
+        return 0
+
+    results = []
+    print "%-24s %-24s %-9s %7s %7s %10s %10s %10s %10s" % (
+        "module", "function", "fixture", "calls", "errors",
+        "p50 us", "p90 us", "p99 us", "allocs")
+    for result in benchmark(args.modules, args.functions, args.fixtures,
+                            args.repeat, args.max_seconds):
+        results.append(result)
+        if result["errors"]:
+            # The times of calls that raised say nothing about the function
+            print "%-24s %-24s %-9s %7d %7d %s" % (
+                result["module"], result["function"], result["fixture"], result["calls"],
+                result["errors"], "raised, not timed")
+        else:
+            print "%-24s %-24s %-9s %7d %7d %10.1f %10.1f %10.1f %10.1f" % (
+                result["module"], result["function"], result["fixture"], result["calls"],
+                0, result["p50_us"], result["p90_us"], result["p99_us"],
+                result["allocs_per_call"])
+        sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(collections.OrderedDict([("meta", metadata()), ("results", results)]),
+                      f, indent=2)
+
+    # A benchmark of calls that raise is a broken benchmark
+    if any(result["errors"] for result in results):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
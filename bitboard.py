@@ -0,0 +1,107 @@
+import const
+import placements
+import zobrist
+
+# Set in every mask built from a cell outside the board, and never empty,
+# so a placement hanging off the edge never fits.
+OFF_BOARD = 1 << len(placements.CELLS)
+ALL_CELLS = OFF_BOARD - 1
+
+def cellMask(cells):
+    """
+    Build the bitmask for a collection of cells.
+    """
+    mask = 0
+    for cell in cells:
+        mask |= placements.CELL_BIT.get(cell, OFF_BOARD)
+    return mask
+
+def maskCells(mask):
+    """
+    Generator for the cells set in a bitmask.
+    """
+    for cell in placements.CELLS:
+        if mask & placements.CELL_BIT[cell]:
+            yield cell
+
+class Bitboard(object):
+    """
+    One side of the board, with each state held as a bitmask over
+    placements.CELLS. Kept alongside the list-of-lists boards from
+    base_player, which remain what the manager sees.
+    """
+
+    __slots__ = ("occupied", "hit", "missed", "filled", "hash")
+
+    def __init__(self):
+        self.occupied = 0
+        self.hit = 0
+        self.missed = 0
+        # Every cell that is not const.EMPTY, plus OFF_BOARD
+        self.filled = OFF_BOARD
+        # zobrist hash of what is in each cell, kept up to date by set
+        self.hash = 0
+
+    @property
+    def empty(self):
+        return ALL_CELLS & ~self.filled
+
+    def set(self, cell, value):
+        """
+        Record value (one of const.EMPTY, OCCUPIED, HIT or MISSED) for cell.
+        """
+        bit = placements.CELL_BIT[cell]
+        old = self._value(bit)
+        self.occupied &= ~bit
+        self.hit &= ~bit
+        self.missed &= ~bit
+        if value == const.OCCUPIED:
+            self.occupied |= bit
+        elif value == const.HIT:
+            self.hit |= bit
+        elif value == const.MISSED:
+            self.missed |= bit
+        self.filled = self.occupied | self.hit | self.missed | OFF_BOARD
+        new = self._value(bit)
+        if new != old:
+            self.hash ^= zobrist.cellKey(cell, old) ^ zobrist.cellKey(cell, new)
+
+    def _value(self, bit):
+        if self.occupied & bit:
+            return const.OCCUPIED
+        if self.hit & bit:
+            return const.HIT
+        if self.missed & bit:
+            return const.MISSED
+        return None
+
+    def isEmpty(self, cell):
+        return not (placements.CELL_BIT.get(cell, OFF_BOARD) & self.filled)
+
+    def fits(self, mask):
+        """
+        Check that every cell in mask is on the board and const.EMPTY.
+        """
+        return not (mask & self.filled)
+
+    def fitsCells(self, cells):
+        """
+        As fits, for cells with no precomputed mask. Stops at the first
+        cell that doesn't fit.
+        """
+        filled = self.filled
+        for cell in cells:
+            if placements.CELL_BIT.get(cell, OFF_BOARD) & filled:
+                return False
+        return True
+
+    @staticmethod
+    def fromBoard(board):
+        """
+        Build a bitboard from a base_player style list-of-lists board.
+        """
+        bits = Bitboard()
+        for cx, cy in placements.CELLS:
+            if board[cx][cy] != const.EMPTY:
+                bits.set((cx, cy), board[cx][cy])
+        return bits
@@ -0,0 +1,317 @@
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import placements
+import zobrist
+
+CELL_INDEX = dict((cell, i) for i, cell in enumerate(placements.CELLS))
+# Bit of each cell, by index into placements.CELLS
+INDEX_BIT = tuple(placements.CELL_BIT[cell] for cell in placements.CELLS)
+
+# Recount with the NumPy kernel when it is available. Both kernels give
+# identical results, so this only changes how fast they arrive.
+USE_NUMPY = numpy is not None
+
+# Counts from DensityMap.recount, by table and DensityMap.hash. Every round
+# starts from the same empty board, so players made afresh for each game
+# in a tournament share the work.
+COUNT_CACHE = zobrist.LRUCache(256)
+
+class DensityTable(object):
+    """
+    Static half of a density map: which placements exist, which cells
+    each one occupies and which cells it adds to the density of.
+    Shared by every DensityMap built from it, so build it once.
+
+    Keyword arguments:
+    entries -- sequence of (ship type, occupied cells, credited cells).
+               A placement stays live while all its occupied cells are empty,
+               and adds one to each credited cell (repeats count repeatedly).
+    """
+
+    def __init__(self, entries):
+        self.shipTypes = []
+        self.types = []
+        self.masks = []
+        self.occupied = []
+        self.credits = []
+        self.byType = {}
+        self.byCell = [[] for _ in placements.CELLS]
+        for i, (shipType, cells, credits) in enumerate(entries):
+            if shipType not in self.byType:
+                self.shipTypes.append(shipType)
+                self.byType[shipType] = []
+            self.byType[shipType].append(i)
+            mask = 0
+            for cell in cells:
+                mask |= placements.CELL_BIT[cell]
+                self.byCell[CELL_INDEX[cell]].append(i)
+            self.types.append(shipType)
+            self.masks.append(mask)
+            self.occupied.append(tuple(CELL_INDEX[cell] for cell in cells))
+            self.credits.append(tuple(CELL_INDEX[cell] for cell in credits))
+
+        self.shipTypes = tuple(self.shipTypes)
+        self.types = tuple(self.types)
+        self.masks = tuple(self.masks)
+        self.occupied = tuple(self.occupied)
+        self.credits = tuple(self.credits)
+        self.byCell = tuple(tuple(entries) for entries in self.byCell)
+        for shipType in self.byType:
+            self.byType[shipType] = tuple(self.byType[shipType])
+        self._arrays = None
+
+    def arrays(self):
+        """
+        Get the NumPy form of the table, building it on first use:
+        occupancy -- placements x cells incidence matrix of occupied cells
+        credits   -- placements x cells matrix of credit counts
+        typeIndex -- index into shipTypes of each placement's type
+        """
+        if self._arrays is None:
+            occupancy = numpy.zeros((len(self.masks), len(placements.CELLS)), dtype=numpy.int32)
+            credits = numpy.zeros((len(self.masks), len(placements.CELLS)), dtype=numpy.int32)
+            for i, cells in enumerate(self.occupied):
+                occupancy[i, list(cells)] = 1
+                for j in self.credits[i]:
+                    credits[i, j] += 1
+            typeIndex = numpy.array([self.shipTypes.index(shipType) for shipType in self.types],
+                                    dtype=numpy.intp)
+            self._arrays = occupancy, credits, typeIndex
+        return self._arrays
+
+def _countPython(table, shipTypes, filled):
+    live = bytearray(len(table.masks))
+    counts = [0] * len(placements.CELLS)
+    for i, shipType in enumerate(table.types):
+        if shipType in shipTypes and not table.masks[i] & filled:
+            live[i] = 1
+            for j in table.credits[i]:
+                counts[j] += 1
+    return live, counts
+
+def _countNumpy(table, shipTypes, filled):
+    occupancy, credits, typeIndex = table.arrays()
+    blocked = numpy.array([1 if filled & placements.CELL_BIT[cell] else 0
+                           for cell in placements.CELLS], dtype=numpy.int32)
+    active = numpy.array([shipType in shipTypes for shipType in table.shipTypes], dtype=bool)
+    live = active[typeIndex] & (occupancy.dot(blocked) == 0)
+    counts = credits.T.dot(live.astype(numpy.int32))
+    return bytearray(live.astype(numpy.uint8).tobytes()), counts.tolist()
+
+def count(table, shipTypes, filled):
+    """
+    Count a density from scratch.
+    Returns the liveness of each placement in the table and the count of
+    each cell, in placements.CELLS order.
+
+    Keyword arguments:
+    table -- DensityTable to count over
+    shipTypes -- collection of the ship types still in play
+    filled -- bitmask of the cells that are no longer empty
+    """
+    shipTypes = set(shipTypes)
+    if USE_NUMPY and numpy is not None:
+        return _countNumpy(table, shipTypes, filled)
+    return _countPython(table, shipTypes, filled)
+
+def best(counts):
+    """
+    Get the highest of a list of counts and the cells that have it,
+    in placements.CELLS order.
+    """
+    max_count = max(counts)
+    return max_count, [cell for cell, c in zip(placements.CELLS, counts) if c == max_count]
+
+_tables = {}
+
+def getTable(catalog):
+    """
+    Get the density table for a placements.Catalog, where each placement
+    is credited to the cells it occupies.
+    """
+    try:
+        return _tables[catalog]
+    except KeyError:
+        table = _tables[catalog] = DensityTable((p.shipType, p.cells, p.cells)
+                                                for p in catalog.placements)
+        return table
+
+def getPivotTable(shapes, rotate):
+    """
+    Get the density table matching countPossibilities in the dominus*
+    variants that rotate the pivot offset but not the shape itself: each
+    unrotated placement is credited to every cell it would be counted from.
+
+    Keyword arguments:
+    shapes -- sequence of (ship type, list of cells) pairs
+    rotate -- function mapping (rotation, cell) to the rotated cell
+    """
+    key = (tuple((shipType, tuple(shape)) for shipType, shape in shapes), rotate)
+    try:
+        return _tables[key]
+    except KeyError:
+        pass
+
+    entries = []
+    for shipType, shape in shapes:
+        offsets = [rotate(rotation, cell) for rotation in range(4) for cell in shape]
+        for anchor in placements.CELLS:
+            cells = [(anchor[0] + cx, anchor[1] + cy) for cx, cy in shape]
+            if not all(cell in placements.CELL_SET for cell in cells):
+                continue
+            credits = [(anchor[0] + ox, anchor[1] + oy) for ox, oy in offsets]
+            entries.append((shipType, cells,
+                            [cell for cell in credits if cell in placements.CELL_SET]))
+    table = _tables[key] = DensityTable(entries)
+    return table
+
+class DensityMap(object):
+    """
+    Per-cell count of the live placements of the remaining ship types.
+
+    shoot() only visits the placements occupying the shot cell, and
+    removeShipType() only those of the removed type, so keeping the map
+    up to date costs nothing like recounting the board every move. The
+    cells with each count are kept as a mask alongside, so best() goes
+    straight to the cells with the highest.
+    """
+
+    __slots__ = ("table", "shipTypes", "filled", "hash", "live", "counts", "_levels", "_max")
+
+    def __init__(self, table, shipTypes=()):
+        self.table = table
+        self.shipTypes = set(shipTypes)
+        self.filled = 0 # Mask of every cell that has been shot
+        # zobrist hash of the shot cells and the ship types
+        self.hash = zobrist.fleetHash(self.shipTypes)
+        self.recount()
+
+    def recount(self):
+        """
+        Recount the whole map from scratch, or fetch the counts from
+        COUNT_CACHE if a map over the same table has been here before.
+        """
+        check = (self.filled, frozenset(self.shipTypes))
+        cached = COUNT_CACHE.get((self.table, self.hash), check)
+        if cached is zobrist.MISSING:
+            cached = count(self.table, self.shipTypes, self.filled)
+            COUNT_CACHE.put((self.table, self.hash), cached, check)
+        # The map changes its counts in place, so only ever hand out copies
+        live, counts = cached
+        self.live, self.counts = bytearray(live), array.array("i", counts)
+        self._rebuildLevels()
+
+    def _rebuildLevels(self):
+        # Mask of the cells with each count, so best() can read off the
+        # highest without scanning every cell
+        self._max = max(self.counts)
+        self._levels = [0] * (self._max + 1)
+        for j, count in enumerate(self.counts):
+            self._levels[count] |= INDEX_BIT[j]
+
+    def _kill(self, i):
+        """
+        Mark placement i dead and take it off the counts.
+        """
+        self.live[i] = 0
+        counts = self.counts
+        levels = self._levels
+        for j in self.table.credits[i]:
+            count = counts[j]
+            bit = INDEX_BIT[j]
+            levels[count] ^= bit
+            levels[count - 1] |= bit
+            counts[j] = count - 1
+        while self._max > 0 and not levels[self._max]:
+            self._max -= 1
+
+    def shoot(self, cell):
+        """
+        Kill every placement occupying cell, now that it is no longer empty.
+        """
+        bit = placements.CELL_BIT[cell]
+        if not self.filled & bit:
+            self.filled |= bit
+            self.hash ^= zobrist.shotKey(cell)
+        live = self.live
+        for i in self.table.byCell[CELL_INDEX[cell]]:
+            if live[i]:
+                self._kill(i)
+
+    def removeShipType(self, shipType):
+        """
+        Take every placement of shipType off the map.
+        """
+        if shipType in self.shipTypes:
+            self.shipTypes.discard(shipType)
+            self.hash ^= zobrist.shipKey(shipType)
+        live = self.live
+        for i in self.table.byType.get(shipType, ()):
+            if live[i]:
+                self._kill(i)
+
+    def setShipTypes(self, shipTypes):
+        """
+        Bring the map in line with a new collection of remaining ship types,
+        adding back the placements of any type that returns.
+        """
+        shipTypes = set(shipTypes)
+        for shipType in self.shipTypes - shipTypes:
+            self.removeShipType(shipType)
+        if shipTypes - self.shipTypes:
+            self.hash ^= zobrist.fleetHash(self.shipTypes) ^ zobrist.fleetHash(shipTypes)
+            self.shipTypes = shipTypes
+            self.recount()
+
+    def count(self, cell):
+        return self.counts[CELL_INDEX[cell]]
+
+    def best(self):
+        """
+        Get the highest count on the board and the cells that have it,
+        in placements.CELLS order.
+        """
+        mask = self._levels[self._max]
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(placements.CELLS[low.bit_length() - 1])
+            mask ^= low
+        return self._max, cells
+
+    def weightedBest(self, weights, top=None):
+        """
+        As best, but for each cell's count times its weight, with weights
+        in placements.CELLS order. Counts are looked at from the highest
+        down, and only while count * top could still reach the best score
+        so far, so this is usually a level or two rather than the board.
+        A best score of 0 comes with no cells.
+
+        Keyword arguments:
+        weights -- sequence of one non-negative weight per cell
+        top -- max(weights), if the caller has it to hand (default: None)
+        """
+        if top is None:
+            top = max(weights)
+        levels = self._levels
+        best_score, best = 0, []
+        for count in range(self._max, 0, -1):
+            if count * top < best_score:
+                break
+            mask = levels[count]
+            while mask:
+                low = mask & -mask
+                j = low.bit_length() - 1
+                mask ^= low
+                score = count * weights[j]
+                if score > best_score:
+                    best_score, best = score, [j]
+                elif score == best_score and score:
+                    best.append(j)
+        best.sort()
+        return best_score, [placements.CELLS[j] for j in best]
@@ -0,0 +1,97 @@
+"""
+Fleet deployment by drawing straight from the legal placements.
+
+Rather than trying random cells and rotations until a ship fits, each ship
+is drawn from the placements that are still legal given the ships already
+down, so every draw succeeds first time. Without a heat map each ship
+is equally likely to take any placement still legal for it.
+
+That is not the distribution the retry loops had. geometry.getRandPiece
+picks a row and then a column in it, so the six-wide rows 0 to 5 had each
+of their cells picked twice as often as a cell of the twelve-wide rows,
+and a placement was as likely as its pivot cell. Ships now sit in the
+wide arm of the board as often as there is room for them there.
+"""
+import random
+
+import geometry
+import placements
+
+# Attempts at a fleet that doesn't touch before letting ships touch
+ATTEMPTS = 10
+
+_halos = {}
+_byType = {}
+
+def halo(placement):
+    """
+    Get the mask of the cells of placement and every cell next to them.
+    """
+    try:
+        return _halos[placement.mask]
+    except KeyError:
+        mask = placement.mask
+        for cell in placement.cells:
+            for neighbour in geometry.neighbours(cell):
+                mask |= placements.CELL_BIT[neighbour]
+        _halos[placement.mask] = mask
+        return mask
+
+def weight(placement, heat):
+    """
+    Get how likely placement is to be drawn, relative to one on no heat.
+    """
+    return 1.0 / (1.0 + sum(heat.get(cell, 0) for cell in placement.cells))
+
+def _drawFleet(catalog, touching, heat, blocked, rng):
+    try:
+        byType = _byType[catalog]
+    except KeyError:
+        byType = _byType[catalog] = dict(
+            (shipType, tuple(p for p in catalog.placements if p.shipType == shipType))
+            for shipType in catalog.shipTypes)
+    hot = 0
+    for cell in heat or ():
+        hot |= placements.CELL_BIT.get(cell, 0)
+    fleet = []
+    for shipType in catalog.shipTypes:
+        legal = [p for p in byType[shipType] if not p.mask & blocked]
+        if not legal:
+            return None
+        if heat:
+            weights = [weight(p, heat) if p.mask & hot else 1.0 for p in legal]
+            point = rng.random() * sum(weights)
+            for placement, w in zip(legal, weights):
+                point -= w
+                if point < 0:
+                    break
+        else:
+            placement = legal[rng.randrange(len(legal))]
+        fleet.append(placement)
+        blocked |= placement.mask if touching else halo(placement)
+    return fleet
+
+def sampleFleet(catalog, touching=False, heat=None, blocked=0, rng=random):
+    """
+    Draw a placement for every ship in a catalog, in catalog.shipTypes order.
+    Raises ValueError if the fleet can't fit at all.
+
+    Keyword arguments:
+    catalog -- placements.Catalog of the fleet
+    touching -- whether ships may share an edge (default: False). If ATTEMPTS
+                draws in a row run out of room apart, the fleet is drawn
+                with touching allowed instead.
+    heat -- dict of how much to avoid each cell (default: None). A placement
+            is drawn 1 / (1 + total heat of its cells) times as often as one
+            with no heat.
+    blocked -- mask of cells no ship may use (default: 0)
+    rng -- random.Random to draw with (default: the random module)
+    """
+    for _ in range(1 if touching else ATTEMPTS):
+        fleet = _drawFleet(catalog, touching, heat, blocked, rng)
+        if fleet is not None:
+            return fleet
+    fleet = _drawFleet(catalog, True, heat, blocked, rng)
+    if fleet is None:
+        raise ValueError("No room for the fleet")
+    return fleet
@@ -1,35 +1,141 @@
 import collections
-import copy
 import itertools
-import random
+import time
 
 import const
-import base_player
+import bitboard
+import density
+import engine
+import fleetstate
+import gamelog
+import gamestate
+import geometry
+import heatmap
+import openingbook
+import placements
+import posterior
+import zobrist
+
+# Results of the kill-mode searches, by zobrist hash of the state they
+# searched. Shared by every Player in the process, so positions that come
+# up again in later games are free.
+KILL_CACHE = zobrist.LRUCache(4096)
+
+class PanicBudgetExceeded(Exception):
+    """
+    Raised inside panicAttack when the search runs out of nodes or time.
+    """
+    pass
+
+class StateProfile(object):
+    """
+    Wall time and call count of each chooseMove state handler over a game,
+    and how many handler calls each move took. Times are also kept as
+    histograms, bucketed by the power of two microseconds they fall under.
+    """
 
-class Player(base_player.BasePlayer):
     def __init__(self):
-        base_player.BasePlayer.__init__(self)
-        self._playerName = "Dominus"
-        self._playerYear = "1"
-        self._version = "Epsilon"
-        self._playerDescription = "\"Dominus\" is Latin for Master. Good luck.\nBy Charles Pigott and Nathan van Doorn"
-
-        self._moves = [] # Our previous moves
-        self.allshapes = collections.OrderedDict({
-            const.CARRIER:    [(0, 0), (1, 0), (2, 0), (1, 1), (1, 2), (1, 3)],
-            const.HOVERCRAFT: [(0, 0), (2, 0), (0, 1), (1, 1), (2, 1), (1, 2)],
-            const.BATTLESHIP: [(0, 0), (0, 1), (0, 2), (0, 3)],
-            const.CRUISER:    [(0, 0), (0, 1), (0, 2)],
-            const.DESTROYER:  [(0, 0), (0, 1)]
-        })
-        self.shapes = collections.OrderedDict({})
-        self.flags = self.enum("FINDA", "FINDB", "KILLA", "KILLB", "PANIC", "FLOOD")
+        self.calls = collections.Counter()
+        self.seconds = collections.defaultdict(float)
+        self.histograms = collections.defaultdict(collections.Counter)
+        self.iterations = collections.Counter() # Handler calls per move -> moves
+
+    def record(self, state, seconds):
+        self.calls[state] += 1
+        self.seconds[state] += seconds
+        self.histograms[state][1 << int(seconds * 1e6).bit_length()] += 1
+
+    def recordMove(self, iterations):
+        self.iterations[iterations] += 1
+
+    def summary(self):
+        """
+        Get the profile as plain dicts:
+        states -- state name -> calls, seconds and histogram
+                  (microsecond bucket upper bound -> calls)
+        iterations -- handler calls in a move -> number of moves
+        """
+        return {
+            "states": dict((state, {"calls": self.calls[state],
+                                    "seconds": self.seconds[state],
+                                    "histogram": dict(self.histograms[state])})
+                           for state in self.calls),
+            "iterations": dict(self.iterations),
+        }
+
+class Player(engine.Player):
+    player_name = "Dominus"
+    player_version = "Epsilon"
+
+    def __init__(self):
+        engine.Player.__init__(self)
+        self.shapes = fleetstate.Fleet(self.FULL_FLEET.table, 0)
+        self.fleet_hash = 0 # zobrist.fleetHash(self.shapes), kept in step by setShapes
+        self.density = density.DensityMap(density.getTable(self.catalog))
         self.hit_regions = []
         self.flag = self.flags.FINDA
 
         self.has_reversed = False
-        self.hit_delta = 0
-        self.space_apart = True
+
+        self.panic_budget_hits = 0 # Searches that ran out of budget
+        self.deadline_hits = 0 # Moves that ran out of time
+        self._deadline_at = None
+
+        # StateProfile of the current game, or None when not profiling
+        self.profile = None
+        self.posterior = None
+
+        self.heat = None # heatmap.HeatMap of the current opponent
+        self._heat_weights = None # Multiplier for each cell this round, or None
+        self._heat_top = None # max(self._heat_weights)
+
+        self.game_log = None # gamelog.GameLog of the current match, or None
+
+    # Settings below are shared by every Player until set on one of them
+
+    # Every ship type and its shape
+    allshapes = engine.SHAPES
+    catalog = placements.getCatalog(allshapes.items(), geometry.rotate)
+    # self.shapes at the start of a round, as a fleetstate.Fleet. Fleets
+    # never change, so every Player and every branch of a search shares it.
+    FULL_FLEET = engine.FLEET
+    density_table = engine.PLACEMENT_DENSITY
+
+    hot_cell_heat = 20 # How strongly deployFleet avoids HOT_CELLS
+
+    # Limits on a single panicAttack search (None for no limit)
+    panic_node_budget = 50000
+    panic_time_budget = None # Seconds
+
+    # Time allowed for each chooseMove call (None for no limit)
+    move_deadline = 1.0 # Seconds
+
+    # Fleets to sample for Monte Carlo targeting (None to use the density map)
+    posterior_samples = None
+    posterior_processes = 1
+
+    # Opening book for find, built by openingbook.py (None to always count)
+    book_path = openingbook.DEFAULT_PATH
+
+    # Where the opponent's ships have been in earlier rounds. find
+    # favours those cells once heat_min_rounds rounds are in.
+    heat_path = None # File to keep heat maps in (None for this match only)
+    heat_strength = 1.0 # 0 to ignore the heat map
+    heat_min_rounds = 3
+
+    # Directory to write a gamelog of each match to (None for no logs)
+    log_dir = None
+
+    # Settings a gamelog records, so a replay plays as the logged game did
+    LOGGED_SETTINGS = ("hot_cell_heat", "panic_node_budget", "panic_time_budget",
+                       "move_deadline", "posterior_samples", "posterior_processes",
+                       "book_path", "heat_strength", "heat_min_rounds")
+
+    # Most likely positions for ships, which deployFleet avoids
+    HOT_CELLS = ((8, 4), (5, 2), (8, 8), (3, 3), (9, 6))
+
+    # Names of the states in Player.flags, in order
+    STATES = ("FINDA", "FINDB", "KILLA", "KILLB", "PANIC", "FLOOD")
 
     ###### Static Methods ######
 
@@ -38,50 +144,7 @@ class Player(base_player.BasePlayer):
         enums = dict(zip(sequential, range(len(sequential))), **named)
         return type('Enum', (), enums)
 
-    @staticmethod
-    def allCells():
-        """
-        Generator for all possible cells in a board.
-        """
-        for x in range(12):
-            for y in range(6 if x < 6 else 12):
-                assert Player.isValidCell((x, y))
-                yield (x, y)
-
-    @staticmethod
-    def getRandPiece():
-        """
-        Get a random piece on the board.
-        """
-        row = random.randint(0, 11)
-        # Board is a weird L shape
-        col = random.randint(0, 5 if row < 6 else 11)
-        # Return move in row (letter) + col (number) grid reference
-        # e.g. A3 is represented as 0,2
-        return (row, col)
-
-    @staticmethod
-    def isValidCell(cell):
-        """
-        Check that a generated cell is valid on the board.
-        """
-        assert(type(cell) == tuple)
-        if cell[0] < 0  or cell[1] < 0:  return False
-        if cell[0] > 11 or cell[1] > 11: return False
-        if cell[0] < 6 and cell[1] > 5:  return False
-        return True
-
-    @staticmethod
-    def getRotationFactor(rotation, cell):
-        if rotation == 0:
-            return cell
-        if rotation == 1:
-            return (-cell[1], cell[0])
-        if rotation == 2:
-            return (-cell[0], -cell[1])
-        if rotation == 3:
-            return (cell[1], -cell[0])
-        raise IndexError # It's sort of an index error
+    getRotationFactor = staticmethod(geometry.rotate)
 
     @staticmethod
     def isValidShip(ship):
@@ -121,15 +184,6 @@ class Player(base_player.BasePlayer):
             trans_ship.append((base[0] + cx, base[1] + cy))
         return trans_ship
 
-    @staticmethod
-    def circleCell(piece):
-        """
-        Rotate around a particular cell on the board.
-        """
-        assert(type(piece) == tuple)
-        rotate = [(-1, 0), (0, 1), (1, 0), (0, -1)]
-        return [(piece[0] + offset[0], piece[1] + offset[1]) for offset in rotate]
-
     @staticmethod
     def getShipType(ship):
         if len(ship) == 2:
@@ -145,48 +199,13 @@ class Player(base_player.BasePlayer):
 
     ###### Class Methods ######
 
-    def makeShip(self, base, shape, count):
-        rotation = random.randint(0, 3)
-        successful = []
-        for coord in shape:
-            rotFact = self.getRotationFactor(rotation, coord)
-            actual = (rotFact[0] + base[0], rotFact[1] + base[1])
-
-            success = True
-            success = success and self.isValidCell(actual)
-            success = success and self._playerBoard[actual[0]][actual[1]] == const.EMPTY
-            if not success: return False
-
-            # Most likely positions for ships
-            if count < 100 and actual in [(8, 4), (5, 2), (8, 8), (3, 3), (9, 6)]:
-                return False
-
-            # Try not to connect ships together
-            for cell in self.circleCell(actual):
-                success = success and (not self.isValidCell(cell) or
-                                       cell in successful or
-                                       self._playerBoard[cell[0]][cell[1]] == const.EMPTY)
-
-            # Don't bother trying to separate ships if it's too hard
-            if self.space_apart and not success and count < 200: return False
-
-            successful.append(actual)
-        for coord in successful:
-            self._playerBoard[coord[0]][coord[1]] = const.OCCUPIED
-        return True
-
     def deployFleet(self):
         """
         Overridden function.
-        Places our fleet of ships on _playerBoard.
+        Places our fleet of ships on _playerBoard. The round was started
+        by newRound.
         """
-        for ship in self.shapes.itervalues():
-            count = 0
-            while True:
-                sp = self.getRandPiece()
-                if self.makeShip(sp, ship, count):
-                    break
-                count += 1
+        self.placeFleet()
 
         # Sanity check
         count = 0
@@ -194,6 +213,8 @@ class Player(base_player.BasePlayer):
             if self._playerBoard[cx][cy] == const.OCCUPIED:
                 count += 1
         assert count == 21
+        if self.game_log is not None:
+            self.game_log.deploy(bitboard.maskCells(self._playerBits.occupied))
         return self._playerBoard
 
     def newRound(self):
@@ -201,39 +222,142 @@ class Player(base_player.BasePlayer):
         Overridden function.
         Things to do on new round.
         """
-        self._initBoards()
-        self._moves = []
+        if self.game_log is not None:
+            # Start each logged round from a known seed, so it can be replayed
+            seed = self.rng.getrandbits(64)
+            self.game_log.round(seed)
+            self.seedRandom(seed)
+        self.recordRound()
+        if self.heat is not None:
+            if self.heat_strength and self.heat.rounds >= self.heat_min_rounds:
+                self._heat_weights = self.heat.weights(self.heat_strength)
+                self._heat_top = max(self._heat_weights)
+            else:
+                self._heat_weights = None
+        self.startRound()
         self.flag = self.flags.FINDA
         self.hit_regions = []
         self.hit_regions.append(set())
 
-        self.shapes = copy.deepcopy(self.allshapes)
+        self.fleet_hash = zobrist.fleetHash(self.shapes)
         self.has_reversed = False
+        if self.posterior is not None:
+            self.posterior.close()
+            self.posterior = None
+        if self.posterior_samples:
+            self.posterior = posterior.PosteriorSampler(self.allshapes.items(),
+                                                        Player.getRotationFactor,
+                                                        self.posterior_samples,
+                                                        self.posterior_processes,
+                                                        self.rng)
+
+        if self.profile is not None:
+            self.profile = StateProfile()
+
+    def revealedCells(self):
+        """
+        Get the cells the opponent's ships are known to have been on this
+        round: every hit, once the whole fleet has been hit, and otherwise
+        the hits of the ships known to be sunk. Hits still in hit_regions
+        could belong to any ship, so only say where we happened to shoot.
+        """
+        hits = set(self._moves.hits())
+        if len(hits) < sum(len(shape) for shape in self.allshapes.itervalues()):
+            hits.difference_update(*self.hit_regions)
+        return hits
 
-        if self.hit_delta >= 3:
-            self.space_apart = not self.space_apart
-        self.hit_delta = 0
+    def recordRound(self):
+        """
+        Add the round just played to the opponent's heat map, if it hasn't
+        been already. We aren't told when a round we lose is over, so this
+        is done by whichever of newRound, newPlayer and close comes next,
+        and always before self.heat moves on to another opponent.
+        """
+        if self.heat is not None:
+            revealed = self.revealedCells()
+            if revealed:
+                self.heat.addRound(revealed)
+                self.heat.store.flush()
+        self._moves = gamestate.MoveLog()
+        self.hit_regions = []
+
+    def setProfiling(self, enabled=True):
+        """
+        Start or stop profiling chooseMove. The profile is started afresh
+        each round.
+        """
+        self.profile = StateProfile() if enabled else None
+
+    def getProfile(self):
+        """
+        Get the StateProfile summary of the current round, or None when
+        not profiling.
+        """
+        if self.profile is None:
+            return None
+        return self.profile.summary()
 
     def newPlayer(self, name=None):
         """
         Overridden function.
         Things to do on new match against a new player.
         """
-        pass
+        self.recordRound()
+        self.heat = heatmap.openStore(self.heat_path).get(name or "")
+        self._heat_weights = None
+        if self.game_log is not None:
+            self.game_log.close()
+            self.game_log = None
+        if self.log_dir is not None:
+            self.game_log = gamelog.openLog(self.log_dir)
+            self.game_log.match(type(self).__module__, name,
+                                dict((setting, getattr(self, setting))
+                                     for setting in self.LOGGED_SETTINGS),
+                                (self.heat.rounds, self.heat.counts))
+
+    def close(self):
+        """
+        Overridden function.
+        Record the last round, shut down the posterior process pool and
+        finish the game log.
+        """
+        self.recordRound()
+        if self.posterior is not None:
+            self.posterior.close()
+            self.posterior = None
+        if self.game_log is not None:
+            self.game_log.close()
+            self.game_log = None
+
+    def setShapes(self, shapes):
+        """
+        Replace self.shapes, keeping fleet_hash and the density map in step.
+        """
+        self.shapes = shapes
+        self.fleet_hash = zobrist.fleetHash(shapes)
+        self.density.setShipTypes(shapes)
+
+    def removeShape(self, ship_type):
+        engine.Player.removeShape(self, ship_type)
+        self.fleet_hash ^= zobrist.shipKey(ship_type)
+
+    def stateHash(self):
+        """
+        Get the zobrist hash of the opponent's board, the remaining ship
+        types and hit_regions. The board and the ships are hashed as they
+        change; hit_regions is changed in place in too many places to
+        follow, and never holds more than 21 cells, so it is hashed afresh.
+        """
+        return (self._opponentBits.hash ^ self.fleet_hash ^
+                zobrist.regionsHash(self.hit_regions))
 
     def calcPossibilities(self):
+        _, counts = density.count(density.getTable(self.catalog), self.shapes,
+                                  self._opponentBits.filled)
         points = collections.defaultdict(int)
-        for (b, s) in itertools.product(self.allCells(),
-                                        self.rotateAllShips(self.shapes.itervalues())):
-            ship = self.translateShip(s, b)
-            if not self.isValidShip(ship):
-                continue
-            for cx, cy in ship:
-                if self._opponenBoard[cx][cy] != const.EMPTY:
-                    break
-            else:
-                for c in ship:
-                    points[c] += 1
+        for c, score in zip(placements.CELLS, counts):
+            if score:
+                points[c] = score
         return points
 
     def calcHitProbabilities(self, hit_region):
@@ -241,24 +365,20 @@ class Player(base_player.BasePlayer):
         found_shape = True
         points = collections.defaultdict(int)
         # "Arbitrary" cell that has been a successful hit
-        bx, by = next(iter(hit_region))
-        for s in self.rotateAllShips(self.shapes.itervalues()):
-            for ox, oy in s:
-                ship = self.translateShip(s, (bx - ox, by - oy))
-                if not self.isValidShip(ship):
-                    continue
-                for cx, cy in ship:
-                    if (cx, cy) not in hit_region and self._opponenBoard[cx][cy] != const.EMPTY:
-                        break
-                else:
-                    if hit_region <= set(ship):
+        b = next(iter(hit_region))
+        # Cells outside the hit region that a placement may not cross
+        blocked = self._opponentBits.filled & ~bitboard.cellMask(hit_region)
+        hits = self._opponentBits.hit
+        for ship_type in self.shapes:
+            for placement in self.catalog.covering[ship_type][b]:
+                if not placement.mask & blocked:
+                    if hit_region <= placement.cellSet:
                         if found_shape:
-                            returning_shape = self.getShipType(ship)
-                        for c in ship:
-                            if self._opponenBoard[c[0]][c[1]] == const.EMPTY:
-                                for adj_x, adj_y in self.circleCell(c):
-                                    if (self.isValidCell((adj_x, adj_y)) and
-                                            self._opponenBoard[adj_x][adj_y] == const.HIT):
+                            returning_shape = placement.shipType
+                        for c in placement.cells:
+                            if self._opponentBits.isEmpty(c):
+                                for adj_cell in self.circleCell(c):
+                                    if hits & placements.CELL_BIT.get(adj_cell, 0):
                                         returning_shape = None
                                         found_shape = False
                                         points[c] += 1
@@ -269,7 +389,7 @@ class Player(base_player.BasePlayer):
     def panicInit(self):
         self.flag = self.flags.PANIC
         # Reinit the list of shapes
-        self.shapes = copy.deepcopy(self.allshapes)
+        self.setShapes(self.FULL_FLEET)
         self.hit_regions = []
         for cx, cy in self.allCells():
             if self._opponenBoard[cx][cy] != const.HIT:
@@ -295,61 +415,149 @@ class Player(base_player.BasePlayer):
                 self.hit_regions.append(set(((cx, cy),)))
         self.hit_regions.sort(cmp=lambda x, y: cmp(len(x), len(y)))
 
+    def coverHitRegions(self):
+        """
+        panicAttack on hit_regions[0] with every remaining ship, through
+        KILL_CACHE. Searches cut short by a time limit aren't cached, as
+        another go might get further; the node budget is part of the key.
+        """
+        bits = self._opponentBits
+        key = ("panicAttack", self.stateHash(), self.shapes, self.panic_node_budget)
+        check = (bits.hit, bits.missed, tuple(frozenset(region) for region in self.hit_regions))
+        result = KILL_CACHE.get(key, check)
+        if result is zobrist.MISSING:
+            budget_hits = self.panic_budget_hits
+            result = self.panicAttack(set(), self.hit_regions[0], self.shapes)
+            if self.panic_budget_hits != budget_hits and self._panic_deadline is not None:
+                return result
+            KILL_CACHE.put(key, result, check)
+        return result
+
     def panicAttack(self, already_covered, need_to_cover, rem_ships, saved_result=None):
         """
         OH GOD WHY?!
+
+        Find a way to cover need_to_cover with the ships in rem_ships.
+        Returns (covered cells, remaining ships, whether a covered cell is
+        still to be shot at), or None if there is no cover. Searches stop
+        after panic_node_budget nodes or panic_time_budget seconds, and
+        then return the best cover found so far, which may be partial.
+        """
+        self._panic_table = {}
+        self._panic_nodes = 0
+        self._panic_first_false = saved_result
+        self._panic_partial = None
+        self._panic_partial_score = 0
+        self._panic_deadline = self._deadline_at
+        if self.panic_time_budget is not None:
+            self._panic_deadline = min(self._panic_deadline or float("inf"),
+                                       time.time() + self.panic_time_budget)
+        try:
+            true_result, false_result = self.panicCover(already_covered, need_to_cover, rem_ships)
+        except PanicBudgetExceeded:
+            self.panic_budget_hits += 1
+            return self._panic_first_false or self._panic_partial
+        finally:
+            self._panic_table = None
+        if true_result:
+            return true_result
+        return saved_result or false_result
+
+    def panicCover(self, already_covered, need_to_cover, rem_ships):
+        """
+        Recursive search behind panicAttack, memoized on the covered cells,
+        the cells still to cover and the remaining ship types.
+        Returns the first cover leaving a cell to shoot at and the first
+        cover that doesn't, either of which may be None.
         """
         if not need_to_cover:
-            for cx, cy in already_covered:
-                if self._opponenBoard[cx][cy] != const.HIT:
-                    return already_covered, rem_ships, True
-            if not saved_result:
-                return already_covered, rem_ships, False
-            else:
-                return saved_result
-
-        bx, by = next(iter(need_to_cover))
-        for s in self.rotateAllShips(rem_ships.itervalues()):
-            for ox, oy in s:
-                ship = self.translateShip(s, (bx - ox, by - oy))
-                if not self.isValidShip(ship):
-                    continue
-                for cx, cy in ship:
-                    # !!!
-                    if ((cx, cy) not in need_to_cover and
-                        ((cx, cy) in already_covered or
-                         (self._opponenBoard[cx][cy] not in [const.EMPTY, const.HIT]))):
-                        break
-                else:
+            if bitboard.cellMask(already_covered) & ~self._opponentBits.hit:
+                return (already_covered, rem_ships, True), None
+            return None, (already_covered, rem_ships, False)
+
+        key = (frozenset(already_covered), frozenset(need_to_cover), rem_ships.mask)
+        try:
+            return self._panic_table[key]
+        except KeyError:
+            pass
+
+        self._panic_nodes += 1
+        if ((self.panic_node_budget is not None and self._panic_nodes > self.panic_node_budget) or
+                (self._panic_deadline is not None and time.time() > self._panic_deadline)):
+            raise PanicBudgetExceeded()
+        self.notePanicPartial(already_covered, rem_ships)
+
+        first_false = None
+        # Pivot on the same cell whatever order need_to_cover was built in,
+        # so the result depends only on the memo key
+        b = min(need_to_cover)
+        # !!!
+        blocked = ((bitboard.cellMask(already_covered) | self._opponentBits.missed) &
+                   ~bitboard.cellMask(need_to_cover))
+        for ship_type in rem_ships:
+            for placement in self.catalog.covering[ship_type][b]:
+                if not placement.mask & blocked:
                     cover_cp = set(need_to_cover)
-                    for cell in ship:
+                    for cell in placement.cells:
                         for adj_cell, region in itertools.product(self.circleCell(cell),
                                                                   self.hit_regions[1:]):
                             if adj_cell in region:
                                 cover_cp |= region
                                 break
 
-                    new_rem_ships = copy.deepcopy(rem_ships)
-                    del new_rem_ships[self.getShipType(ship)]
-                    ret_val = self.panicAttack(already_covered | set(ship),
-                                               cover_cp - set(ship),
-                                               new_rem_ships, saved_result)
-                    if ret_val is not None:
-                        if ret_val[2]:
-                            return ret_val
-                        if not saved_result:
-                            saved_result = ret_val
-        return saved_result
+                    true_result, false_result = self.panicCover(already_covered | placement.cellSet,
+                                                                cover_cp - placement.cellSet,
+                                                                rem_ships.without(placement.shipType))
+                    if true_result:
+                        return true_result, first_false
+                    if false_result and not first_false:
+                        first_false = false_result
+                        if not self._panic_first_false:
+                            self._panic_first_false = false_result
+        self._panic_table[key] = None, first_false
+        return None, first_false
+
+    def notePanicPartial(self, covered, rem_ships):
+        """
+        Remember covered as the best partial cover so far if it covers the
+        most hits yet and has an empty cell next to hit_regions[0] to shoot.
+        """
+        score = bin(bitboard.cellMask(covered) & self._opponentBits.hit).count("1")
+        if score <= self._panic_partial_score:
+            return
+        for cell in covered:
+            if not self._opponentBits.isEmpty(cell):
+                continue
+            for adj_cell in self.circleCell(cell):
+                if adj_cell in self.hit_regions[0]:
+                    self._panic_partial = (set(covered), rem_ships, True)
+                    self._panic_partial_score = score
+                    return
+
+    def posteriorBest(self, candidates=None):
+        """
+        Get the best of candidates (default: every empty cell) to shoot
+        according to self.posterior, as for PosteriorSampler.best. The hits
+        in hit_regions are the ones still to be accounted for, and the rest
+        belong to ships already sunk.
+        """
+        hits = bitboard.cellMask(set().union(*self.hit_regions))
+        blocked = self._opponentBits.missed | (self._opponentBits.hit & ~hits)
+        return self.posterior.best(self.shapes, hits, blocked, candidates)
 
     def killA(self):
         assert self.hit_regions and len(self.hit_regions) == 1 and self.hit_regions[0]
         returning_shape, points = self.calcHitProbabilities(self.hit_regions[0])
+        if points and self.posterior is not None:
+            max_score, poss_moves = self.posteriorBest(points)
+            if max_score:
+                return self.rng.choice(poss_moves)
         if points:
             max_score = max(points.itervalues())
             poss_moves = [x for x, score in points.iteritems() if score == max_score]
-            return random.choice(poss_moves)
+            return self.rng.choice(poss_moves)
         elif returning_shape:
-            del self.shapes[returning_shape]
+            self.removeShape(returning_shape)
             self.flag = self.flags.FINDA
             self.hit_regions[0] = set()
         else:
@@ -359,7 +567,7 @@ class Player(base_player.BasePlayer):
         assert self.hit_regions and self.hit_regions[0]
 
         try:
-            covered, rem_ships, _ = self.panicAttack(set(), self.hit_regions[0], self.shapes)
+            covered, rem_ships, _ = self.coverHitRegions()
             self.has_reversed = False
         except:
             if self.has_reversed:
@@ -369,8 +577,15 @@ class Player(base_player.BasePlayer):
             self.has_reversed = not self.has_reversed
             # Woops, try again
             self.panicInit()
-            self.shapes = collections.OrderedDict(reversed(self.shapes.items()))
+            self.shapes = self.shapes.reversedOrder()
             return (-1, -1)
+        if self.posterior is not None:
+            targets = [cell for cell in covered if self._opponentBits.isEmpty(cell) and
+                       any(adj_cell in self.hit_regions[0] for adj_cell in self.circleCell(cell))]
+            if targets:
+                max_score, poss_moves = self.posteriorBest(targets)
+                if max_score:
+                    return self.rng.choice(poss_moves)
         for cx, cy in covered:
             if self._opponenBoard[cx][cy] != const.EMPTY:
                 continue
@@ -386,7 +601,7 @@ class Player(base_player.BasePlayer):
         assert self.hit_regions and self.hit_regions[0]
         # :(
         try:
-            covered, rem_ships, _ = self.panicAttack(set(), self.hit_regions[0], self.shapes)
+            covered, rem_ships, _ = self.coverHitRegions()
             self.has_reversed = False
         except:
             if self.has_reversed:
@@ -396,7 +611,7 @@ class Player(base_player.BasePlayer):
             self.has_reversed = not self.has_reversed
             # Woops, try again
             self.panicInit()
-            self.shapes = collections.OrderedDict(reversed(self.shapes.items()))
+            self.shapes = self.shapes.reversedOrder()
             return (-1, -1)
         for cx, cy in covered:
             if self._opponenBoard[cx][cy] != const.EMPTY:
@@ -410,28 +625,41 @@ class Player(base_player.BasePlayer):
                 region -= covered
             while self.hit_regions and not self.hit_regions[0]:
                 self.hit_regions = self.hit_regions[1:]
-            self.shapes = rem_ships
+            self.setShapes(rem_ships)
             if not self.hit_regions:
                 self.flag = self.flags.FINDB
 
     def find(self):
-        points = self.calcPossibilities()
-        if points:
-            max_score = max(points.itervalues())
-            poss_moves = [x for x, score in points.iteritems() if score == max_score]
-            return random.choice(poss_moves)
+        # self.density holds what calcPossibilities() would return, kept
+        # up to date by setOutcome and changes to self.shapes
+        if self.posterior is not None:
+            max_score, poss_moves = self.posteriorBest()
+            if max_score:
+                return self.rng.choice(poss_moves)
+        elif self._heat_weights is not None:
+            # Weight each cell's count by how often the opponent uses it.
+            # The book only knows unweighted counts, so can't answer this;
+            # weightedBest reads the density map's top levels instead.
+            max_score, poss_moves = self.density.weightedBest(self._heat_weights,
+                                                              self._heat_top)
+            if max_score:
+                return self.rng.choice(poss_moves)
+        elif self.book_path is not None:
+            # The density only depends on the cells shot and the ships left,
+            # so early on the answer may already be in the book
+            poss_moves = openingbook.load(self.book_path).get(
+                (openingbook.fleetKey(self.shapes, self.allshapes), self.density.filled))
+            if poss_moves:
+                return self.rng.choice(poss_moves)
+        max_score, poss_moves = self.density.best()
+        if max_score:
+            return self.rng.choice(poss_moves)
         else:
             self.panicInit()
 
     def flood(self):
-        for cx, cy in self.allCells():
-            if self._opponenBoard[cx][cy] != const.HIT:
-                continue
-
-            for adj_x, adj_y in self.circleCell((cx, cy)):
-                if self.isValidCell((adj_x, adj_y)) and self._opponenBoard[adj_x][adj_y] == const.EMPTY:
-                    return (adj_x, adj_y)
-        return 27
+        move = engine.floodCell(self)
+        return 27 if move is None else move
 
     def chooseMove(self):
         """
@@ -439,6 +667,22 @@ class Player(base_player.BasePlayer):
         Decide what move to make based on current state of
         opponent's board and return it
         """
+        if self.move_deadline is not None:
+            self._deadline_at = time.time() + self.move_deadline
+        try:
+            move = self.chooseMoveBefore()
+        finally:
+            self._deadline_at = None
+        if self.game_log is not None:
+            self.game_log.choose(move)
+        return move
+
+    def chooseMoveBefore(self):
+        """
+        Body of chooseMove. Searches give up at _deadline_at with the best
+        answer they have, and once it has passed, the state handlers are
+        skipped in favour of flood() and a random diagonal cell.
+        """
         decMv = (-1, -1)
 
         flagdict = {
@@ -450,28 +694,34 @@ class Player(base_player.BasePlayer):
             self.flags.FLOOD: self.flood,
         }
 
+        iterations = 0
         while not decMv or not self.isValidCell(decMv):
-            decMv = flagdict[self.flag]()
+            iterations += 1
+            if self._deadline_at is not None and time.time() > self._deadline_at:
+                # Out of time, take anything next to a hit
+                self.deadline_hits += 1
+                state, handler = "DEADLINE", self.flood
+            else:
+                state, handler = self.STATES[self.flag], flagdict[self.flag]
+            if self.profile is None:
+                decMv = handler()
+            else:
+                start = time.time()
+                decMv = handler()
+                self.profile.record(state, time.time() - start)
             # Uh oh.
             if decMv == 27:
                 decMv = (-1, -1)
                 break
 
+        if self.profile is not None:
+            self.profile.recordMove(iterations)
+
         if self.isValidCell(decMv) and self._opponenBoard[decMv[0]][decMv[1]] == const.EMPTY:
             return decMv
 
         # Failing that, get a random cell (in a diagonal pattern)
-        count = 0
-        while (not self.isValidCell(decMv) or
-                self._opponenBoard[decMv[0]][decMv[1]] != const.EMPTY):
-            decMv = self.getRandPiece()
-            if count < 50 and (decMv[0] + decMv[1]) % 2 != 0:
-                decMv = (-1, -1)
-            count += 1
-
-        assert(self.isValidCell(decMv) and
-               self._opponenBoard[decMv[0]][decMv[1]] == const.EMPTY)
-        return decMv
+        return engine.parityHunt(self)
 
     def setOutcome(self, entry, row, col):
         """
@@ -483,8 +733,6 @@ class Player(base_player.BasePlayer):
         """
 
         if entry == const.HIT:
-            self.hit_delta -= 1
-            Outcome = const.HIT
             if self.flag == self.flags.PANIC:
                 hit_region_matched = []
                 for region in self.hit_regions:
@@ -513,12 +761,9 @@ class Player(base_player.BasePlayer):
                 self.flag = self.flags.KILLA
             else:
                 self.flag = self.flags.KILLB
-        elif entry == const.MISSED:
-            Outcome = const.MISSED
-        else:
-            raise Exception("Invalid input!")
-        self._opponenBoard[row][col] = Outcome
-        self._moves.append(((row, col), Outcome))
+        engine.Player.setOutcome(self, entry, row, col)
+        if self.game_log is not None:
+            self.game_log.outcome(entry, (row, col))
 
     def getOpponentMove(self, row, col):
         """
@@ -527,17 +772,13 @@ class Player(base_player.BasePlayer):
         has missed, but here we just acknowledge it. Note case A3 is
         represented as row = 0, col = 2.
         """
-        if ((self._playerBoard[row][col] == const.OCCUPIED)
-            or (self._playerBoard[row][col] == const.HIT)):
-            # They may (stupidly) hit the same square twice so we check for occupied or hit
-            self._playerBoard[row][col] = const.HIT
-            result = const.HIT
-            self.hit_delta += 1
-        else:
-            # You might like to keep track of where your opponent has missed, but here we just acknowledge it
-            result = const.MISSED
+        result = engine.Player.getOpponentMove(self, row, col)
+        if self.game_log is not None:
+            self.game_log.opponent((row, col))
         return result
 
+# Built once the class can call enum, and shared by every Player
+Player.flags = Player.enum(*Player.STATES)
 
 def getPlayer():
     """ MUST NOT be changed, used to get a instance of your class."""
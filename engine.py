@@ -0,0 +1,513 @@
+"""
+The core every Player is built on, and the policies that configure it.
+
+A Player keeps the boards, its moves and the remaining fleet, and makes
+each move by trying its target policies and then its hunt policies in
+order until one gives a cell. Policies are plain functions of the player
+that return a cell, or None to pass to the next:
+
+    targets -- adjacentTarget, borderTarget, floodTarget,
+               singleShipTarget, multiShipTarget, exactCoverTarget
+    hunts   -- densityHunt, parityHunt, randomHunt
+
+and deploy is a SampleDeploy. Each player module is then a subclass of
+Player setting its name, fleet, density table and policies, and anything
+made faster here is faster for all of them. The fleets, catalogs and
+density tables are built once and shared by every player using them.
+"""
+import collections
+
+import const
+import base_player
+import bitboard
+import density
+import deployment
+import exactcover
+import fleetstate
+import frontier
+import gamestate
+import geometry
+import placements
+import seeding
+
+DESCRIPTION = "\"Dominus\" is Latin for Master. Good luck.\nBy Charles Pigott and Nathan van Doorn"
+
+# Every ship type and its shape, as dominus and the straw players have them
+SHAPES = collections.OrderedDict({
+    const.CARRIER:    ((0, 0), (1, 0), (2, 0), (1, 1), (1, 2), (1, 3)),
+    const.HOVERCRAFT: ((0, 0), (2, 0), (0, 1), (1, 1), (2, 1), (1, 2)),
+    const.BATTLESHIP: ((0, 0), (0, 1), (0, 2), (0, 3)),
+    const.CRUISER:    ((0, 0), (0, 1), (0, 2)),
+    const.DESTROYER:  ((0, 0), (0, 1))
+})
+FLEET = fleetstate.fullFleet(SHAPES.items())
+
+# The same ships as the other dominus* players have them, each its own
+# ship type, centred for geometry.rotateVariant
+VARIANT_SHIPS = (
+    frozenset([(-1,  0), (0,  0), (0, -1), (0, 1), (1, -1), (1, 1)]), # Hovercraft
+    frozenset([(-1, -1), (1, -1), (0, -1), (0, 0), (0,  1), (0, 2)]), # Aircraft Carrier
+    frozenset([( 0,  0), (0,  1), (0,  2), (0, 3)]), # Battleship
+    frozenset([( 0,  0), (0,  1), (0,  2)]), # Cruiser
+    frozenset([( 0,  0), (1,  0)])) # Destroyer
+VARIANT_FLEET = fleetstate.fullFleet((ship, ship) for ship in VARIANT_SHIPS)
+
+# Kinds of density table a Player can keep (see Player.density_table)
+PLACEMENT_DENSITY = "placement" # Each placement credited to the cells it covers
+PIVOT_DENSITY = "pivot" # As density.getPivotTable
+
+###### Deploy policies ######
+
+class SampleDeploy(object):
+    """
+    Deploy policy drawing the fleet from the player's catalog with
+    deployment.sampleFleet, kept off the player's HOT_CELLS.
+
+    Keyword arguments:
+    touching -- whether ships may touch, or None to follow the player's
+                space_apart (default: None)
+    blocked -- mask of cells no ship may use (default: 0)
+    """
+
+    def __init__(self, touching=None, blocked=0):
+        self.touching = touching
+        self.blocked = blocked
+
+    def __call__(self, player):
+        touching = not player.space_apart if self.touching is None else self.touching
+        heat = dict.fromkeys(player.HOT_CELLS, player.hot_cell_heat)
+        return deployment.sampleFleet(player.catalog, touching=touching, heat=heat,
+                                      blocked=self.blocked, rng=player.rng)
+
+###### Target policies ######
+
+def hitRegion(player):
+    """
+    Get the cells hit since the region was last covered, or nothing while
+    flooding, when floodTarget looks after every hit.
+    """
+    if player.flooding:
+        return set()
+    return {x[0] for x in reversed(player._moves) if x[1] == const.HIT}
+
+def regionBorder(player, region):
+    """
+    Get the set of empty cells next to region.
+    """
+    border = set()
+    for cell in [c for x in region for c in player.circleCell(x)]:
+        if player.isValidCell(cell) and player._opponenBoard[cell[0]][cell[1]] == const.EMPTY:
+            border.add(cell)
+    return border
+
+def adjacentTarget(player):
+    """
+    An empty cell next to the latest hit that has one.
+    """
+    for x in reversed(player._moves):
+        if x[1] != const.HIT:
+            continue
+
+        for cell in player.circleCell(x[0]):
+            if (player.isValidCell(cell) and
+                    player._opponenBoard[cell[0]][cell[1]] == const.EMPTY):
+                return cell[0], cell[1]
+
+def borderTarget(player):
+    """
+    Any empty cell next to the hit region.
+    """
+    for cell in [c for x in hitRegion(player) for c in player.circleCell(x)]:
+        if player.isValidCell(cell) and player._opponenBoard[cell[0]][cell[1]] == const.EMPTY:
+            return cell
+
+def floodCell(player):
+    """
+    Get the empty cell next to a hit that comes first by the player's
+    flood_priority, or None if there isn't one. The player's frontier is
+    only built the first time a round floods, replaying the hits of _moves
+    in the order they were shot, and kept up to date from then.
+    """
+    if player.frontier is None:
+        player.frontier = frontier.Frontier.fromBoard(player._opponenBoard,
+                                                      player.flood_priority, player.density,
+                                                      player._moves)
+    return player.frontier.peek()
+
+def floodTarget(player):
+    """
+    Once the player has started flooding, any empty cell next to any hit.
+    """
+    if player.flooding:
+        return floodCell(player)
+
+def singleShipTarget(player):
+    """
+    The border cell most likely to be a hit, if one ship covers the hit region.
+    """
+    region = hitRegion(player)
+    if region:
+        return player.coverWithSingleShip(region, regionBorder(player, region))
+
+def multiShipTarget(player):
+    """
+    The border cell most likely to be a hit, if ships side by side cover
+    the hit region.
+    """
+    region = hitRegion(player)
+    if region:
+        return player.coverWithMultipleShips(region, regionBorder(player, region))
+
+def exactCoverTarget(player):
+    """
+    Take the ships that exactly cover the hit region off the fleet and
+    start a new region. If none do, start flooding.
+    """
+    region = hitRegion(player)
+    if not region:
+        return None
+    try:
+        ships = player.analyzeHitRegion(region, player.shapes)[0]
+    except IndexError:
+        player.startFlood()
+        return floodTarget(player)
+    for ship in ships:
+        player.removeShape(ship)
+
+    # Reset _moves because we've checked all the hits we care about.
+    player._moves = gamestate.MoveLog()
+
+###### Hunt policies ######
+
+def densityHunt(player):
+    """
+    The first cell, in placements.CELLS order, of highest density.
+    """
+    bestProb, bestCells = player.density.best()
+    if bestProb > 0:
+        return bestCells[0]
+
+def parityHunt(player):
+    """
+    A random empty cell on the diagonal pattern, or off it once 50 draws
+    have missed.
+    """
+    decMv = (-1, -1)
+    count = 0
+    while (not player.isValidCell(decMv) or
+            player._opponenBoard[decMv[0]][decMv[1]] != const.EMPTY):
+        decMv = player.getRandPiece()
+        if count < 50 and (decMv[0] + decMv[1]) % 2 != 0:
+            decMv = (-1, -1)
+        count += 1
+    return decMv
+
+def randomHunt(player):
+    """
+    A random empty cell.
+    """
+    decMv = player.getRandPiece()
+    while player._opponenBoard[decMv[0]][decMv[1]] != const.EMPTY:
+        decMv = player.getRandPiece()
+    return decMv
+
+###### The core ######
+
+class Player(seeding.SeededPlayer, base_player.BasePlayer):
+    """
+    A Player made up of policies. Subclasses configure it with the class
+    attributes below.
+    """
+
+    player_name = "Dominus"
+    player_version = "Alpha"
+    player_description = DESCRIPTION
+
+    # The fleet at the start of a round, as a fleetstate.Fleet
+    FULL_FLEET = VARIANT_FLEET
+    getRotationFactor = staticmethod(geometry.rotateVariant)
+    # PLACEMENT_DENSITY, PIVOT_DENSITY, or None for no density map
+    density_table = None
+
+    deploy = SampleDeploy()
+    targets = ()
+    hunts = (parityHunt,)
+
+    # Which empty cell next to a hit floodCell takes first (see frontier.py)
+    flood_priority = staticmethod(frontier.boardOrder)
+
+    # Cells deployFleet avoids, and how strongly
+    HOT_CELLS = ()
+    hot_cell_heat = 20
+
+    # A round in which the opponent got this many more hits than we did
+    # swaps space_apart for the next one
+    swap_delta = 3
+
+    def __init__(self):
+        base_player.BasePlayer.__init__(self)
+        self.initRandom()
+        self._playerName = self.player_name
+        self._playerYear = "1"
+        self._version = self.player_version
+        self._playerDescription = self.player_description
+
+        self._moves = gamestate.MoveLog() # Our previous moves
+        self.shapes = self.FULL_FLEET
+        self.density = None
+        self.frontier = None # frontier.Frontier, once floodCell is needed this round
+        self.flooding = False # Whether floodTarget has taken over from the hit region
+        self.hit_delta = 0 # How far ahead of us the opponent is this round
+        self.space_apart = True # Whether deployFleet keeps ships from touching
+
+    isValidCell = staticmethod(geometry.isValidCell)
+    circleCell = staticmethod(geometry.neighbours)
+    allCells = staticmethod(geometry.allCells)
+
+    @property
+    def catalog(self):
+        return placements.getCatalog(self.FULL_FLEET.items(), self.getRotationFactor)
+
+    def densityTable(self):
+        """
+        Get the shared density table density_table asks for, or None.
+        """
+        if self.density_table == PLACEMENT_DENSITY:
+            return density.getTable(self.catalog)
+        elif self.density_table == PIVOT_DENSITY:
+            return density.getPivotTable(self.FULL_FLEET.items(), self.getRotationFactor)
+        return None
+
+    def _initBoards(self):
+        base_player.BasePlayer._initBoards(self)
+        self._playerBoard = gamestate.compactBoard(self._playerBoard)
+        self._opponenBoard = gamestate.compactBoard(self._opponenBoard)
+        # Bitboard mirrors of _playerBoard and _opponenBoard
+        self._playerBits = bitboard.Bitboard()
+        self._opponentBits = bitboard.Bitboard()
+
+    def startRound(self):
+        """
+        Put everything back as it is at the start of a round.
+        """
+        if self.hit_delta >= self.swap_delta:
+            self.space_apart = not self.space_apart
+        self.hit_delta = 0
+        self._initBoards()
+        self._moves = gamestate.MoveLog()
+        self.shapes = self.FULL_FLEET
+        self.flooding = False
+        table = self.densityTable()
+        self.density = None if table is None else density.DensityMap(table, self.shapes)
+        self.frontier = None
+
+    def placeFleet(self):
+        """
+        Put the fleet the deploy policy draws on _playerBoard, and return it.
+        """
+        for placement in self.deploy(self):
+            for coord in placement.cells:
+                self._playerBoard[coord[0]][coord[1]] = const.OCCUPIED
+                self._playerBits.set(coord, const.OCCUPIED)
+        return self._playerBoard
+
+    def deployFleet(self):
+        """
+        Start the round and deploy the fleet on _playerBoard.
+        """
+        self.startRound()
+        return self.placeFleet()
+
+    def chooseMove(self):
+        """
+        Get the first move the target policies, then the hunt policies, give.
+        """
+        for policy in self.targets + self.hunts:
+            move = policy(self)
+            if move is not None:
+                return move
+        # Only a Player without a fallback hunt policy gets here
+        return (-1, -1)
+
+    def removeShape(self, ship_type):
+        self.shapes = self.shapes.without(ship_type)
+        if self.density is not None:
+            self.density.removeShipType(ship_type)
+
+    def startFlood(self):
+        """
+        Give up on covering the hit region and shoot next to every hit from
+        now on, trusting nothing about which ships are left.
+        """
+        self.flooding = True
+        self.shapes = self.FULL_FLEET
+        if self.density is not None:
+            self.density.setShipTypes(self.shapes)
+
+    def countPossibilities(self, coord, shape):
+        """
+        Count the number of ways the given shape could be credited to the
+        given coordinate in the density map, with the cells shot so far.
+
+        Keyword arguments:
+        coord -- piece on the board to check
+        shape -- ship type to try placing
+        """
+        table = self.density.table
+        index = density.CELL_INDEX[coord]
+        filled = self.density.filled
+        return sum(table.credits[i].count(index) for i in table.byType.get(shape, ())
+                   if not table.masks[i] & filled)
+
+    def analyzeHitRegion(self, remPoints, toTestShips, toDelShips=[], limit=1):
+        """
+        Gets a list of ship types whose ships precisely cover a set of points.
+
+        Keyword arguments:
+        remPoints -- remaining coords to test
+        toTestShips -- ship types still to test
+        toDelShips -- ship types already used in the solution
+        limit -- most solutions to find (default: 1, None for all)
+        """
+        return [toDelShips + ships for ships in
+                exactcover.tileRegion(remPoints, toTestShips, self.getRotationFactor, limit,
+                                      self.FULL_FLEET.table.shapes.__getitem__)]
+
+    def coverWithSingleShip(self, hitRegion, border):
+        """
+        Chooses the most likely cell in the border to be a hit, assuming
+        that there is only one ship, where no others are adjacent to it.
+
+        Keyword arguments:
+        hitRegion -- set of known hits
+        border -- set of points adjacent to these hits
+        """
+        borderScores = dict.fromkeys(border, 0)
+        regionMask = bitboard.cellMask(hitRegion)
+        # Cells no ship covering the region could use
+        shot = self._opponentBits.filled & ~regionMask
+
+        for cell in hitRegion:
+            for shipType in self.shapes:
+                for placement in self.catalog.covering[shipType][cell]:
+                    if placement.mask & regionMask == regionMask and not placement.mask & shot:
+                        for coord in placement.cellSet & border:
+                            borderScores[coord] += 1
+
+        try:
+            best = max(borderScores.items(), key = lambda kv: kv[1])
+            if best[1]:
+                return best[0]
+
+        except ValueError:
+            pass
+
+    def coverWithMultipleShips(self, hitRegion, border):
+        """
+        Chooses the most likely cell in the border to be a hit, assuming
+        there are ships adjacent to each other.
+
+        Keyword arguments:
+        hitRegion -- set of known hits
+        border -- set of points adjacent to these hits
+        """
+        borderScores = dict.fromkeys(border, 0)
+
+        def helperFunction(toCover, covered, remaining):
+            """
+            Recursive helper function to calculate the best point on the
+            board to hit.
+
+            Keyword arguments:
+            toCover -- set of coords to cover
+            covered -- set of coords already covered
+            remaining -- remaining ship types to check
+            """
+            if toCover:
+                if remaining:
+                    # hacky way to get an arbitrary cell from toCover
+                    # if you know a better way please put it in
+                    checkingCell = None
+                    for c in toCover:
+                        checkingCell = c
+                        break
+
+                    for shipType in self.shapes:
+                        for placement in self.catalog.covering[shipType][c]:
+                            shape = placement.cellSet
+
+                            # make sure it fits
+
+                            valid = True
+
+                            for cx, cy in shape:
+                                valid = valid and self._opponenBoard[cx][cy] == const.EMPTY or (cx, cy) in toCover
+                                valid = valid and (cx, cy) not in covered
+                                if not valid:
+                                    break
+
+                            if valid:
+                                helperFunction(toCover - shape, covered | shape, remaining[:].remove(shipType))
+
+            else:
+                # FLAWLESS VICTORY!
+                # update the weightings
+                for coord in covered & border:
+                    borderScores[coord] += 1
+
+        helperFunction(hitRegion, frozenset(), list(self.shapes))
+        try:
+            best = max(borderScores.items(), key = lambda kv: kv[1])
+            if best[1]:
+                return best[0]
+        except ValueError:
+            pass
+
+    def setOutcome(self, entry, row, col):
+        """
+        Update the opponent board with the outcome of our previous move.
+
+        Keyword arguments:
+        entry -- the outcome of your shot onto your opponent, expected value
+                 is const.HIT for hit and const.MISSED for missed
+        row -- the board row number (e.g. row A is 0)
+        col -- the board column (e.g. col 2 is represented by value 3)
+        """
+        if entry == const.HIT:
+            self.hit_delta -= 1
+            Outcome = const.HIT
+        elif entry == const.MISSED:
+            Outcome = const.MISSED
+        else:
+            raise Exception("Invalid input!")
+        self._opponenBoard[row][col] = Outcome
+        self._opponentBits.set((row, col), Outcome)
+        if self.density is not None:
+            self.density.shoot((row, col))
+        if self.frontier is not None:
+            self.frontier.shoot((row, col), Outcome == const.HIT)
+        self._moves.append(((row, col), Outcome))
+
+    def getOpponentMove(self, row, col):
+        """
+        Keep track of where the opponent is hitting. Note case A3 is
+        represented as row = 0, col = 2.
+        """
+        if ((self._playerBoard[row][col] == const.OCCUPIED)
+            or (self._playerBoard[row][col] == const.HIT)):
+            # They may (stupidly) hit the same square twice so we check for occupied or hit
+            self._playerBoard[row][col] = const.HIT
+            self._playerBits.set((row, col), const.HIT)
+            result = const.HIT
+            self.hit_delta += 1
+        else:
+            # You might like to keep track of where your opponent has missed, but here we just acknowledge it
+            result = const.MISSED
+        return result
+
+    def close(self):
+        """
+        Let go of anything the player holds open, once it has played its
+        last round. Runners call this when a match is over.
+        """
+        pass
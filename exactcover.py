@@ -0,0 +1,172 @@
+class ExactCover(object):
+    """
+    Knuth's Algorithm X over a sparse 0/1 matrix. Columns map to the set of
+    rows covering them, so covering and uncovering a column are the same
+    cheap unlink/relink steps as in dancing links.
+
+    Keyword arguments:
+    rows -- list of the columns covered by each row
+    primary -- columns that must be covered exactly once
+    secondary -- columns that may be covered at most once
+    """
+
+    def __init__(self, rows, primary, secondary=()):
+        self.rows = [tuple(columns) for columns in rows]
+        self.primary = list(primary)
+        self.secondary = list(secondary)
+        # Break ties between equally constrained columns the same way every time
+        self._order = dict((column, i) for i, column in enumerate(self.primary))
+
+    def _matrix(self):
+        X = dict((column, set()) for column in self.primary + self.secondary)
+        for i, columns in enumerate(self.rows):
+            if all(column in X for column in columns):
+                for column in columns:
+                    X[column].add(i)
+        return X
+
+    def _choose(self, X):
+        """
+        Get the uncovered primary column with the fewest rows, or None
+        if every primary column is covered.
+        """
+        best = None
+        for column in X:
+            if column in self._order and (best is None or
+                    (len(X[column]), self._order[column]) < (len(X[best]), self._order[best])):
+                best = column
+        return best
+
+    def _select(self, X, row):
+        removed = []
+        for column in self.rows[row]:
+            for other in X[column]:
+                for other_column in self.rows[other]:
+                    if other_column != column:
+                        X[other_column].discard(other)
+            removed.append(X.pop(column))
+        return removed
+
+    def _deselect(self, X, row, removed):
+        for column in reversed(self.rows[row]):
+            X[column] = removed.pop()
+            for other in X[column]:
+                for other_column in self.rows[other]:
+                    if other_column != column:
+                        X[other_column].add(other)
+
+    def _solve(self, X, solution):
+        column = self._choose(X)
+        if column is None:
+            yield list(solution)
+            return
+        for row in sorted(X[column]):
+            solution.append(row)
+            removed = self._select(X, row)
+            for found in self._solve(X, solution):
+                yield found
+            self._deselect(X, row, removed)
+            solution.pop()
+
+    def solutions(self, limit=None):
+        """
+        Generator for solutions, each a list of row indices. Solutions are
+        found one at a time, so stopping early skips the rest of the search.
+
+        Keyword arguments:
+        limit -- stop after this many solutions (default: no limit)
+        """
+        if limit is not None and limit <= 0:
+            return
+        for count, solution in enumerate(self._solve(self._matrix(), []), 1):
+            yield solution
+            if count == limit:
+                return
+
+    def first(self):
+        """
+        Get the first solution, or None if there isn't one.
+        """
+        for solution in self.solutions(1):
+            return solution
+        return None
+
+    def count(self):
+        """
+        Count the solutions without listing them, memoized on the set of
+        uncovered columns.
+        """
+        return self._count(self._matrix(), {})
+
+    def _count(self, X, memo):
+        column = self._choose(X)
+        if column is None:
+            return 1
+        key = frozenset(X)
+        try:
+            return memo[key]
+        except KeyError:
+            pass
+        total = 0
+        for row in list(X[column]):
+            removed = self._select(X, row)
+            total += self._count(X, memo)
+            self._deselect(X, row, removed)
+        memo[key] = total
+        return total
+
+def shipPlacements(region, ship, rotate):
+    """
+    Get every distinct way of placing ship entirely inside region.
+
+    Keyword arguments:
+    region -- set of cells
+    ship -- list of cells making up the ship
+    rotate -- function mapping (rotation, cell) to the rotated cell
+    """
+    found = set()
+    for rotation in range(4):
+        rotated = [rotate(rotation, cell) for cell in ship]
+        for fx, fy in region:
+            for ox, oy in rotated:
+                cells = frozenset((fx - ox + px, fy - oy + py) for px, py in rotated)
+                if cells <= region:
+                    found.add(cells)
+    return sorted(found, key=sorted)
+
+def tileRegion(region, ships, rotate, limit=1, shape=None):
+    """
+    Generator for the sets of ships that exactly tile region.
+
+    Ships are decided from the end of the list back, preferring to leave a
+    ship out, so the first set found is the one the old recursive
+    analyzeHitRegion search aimed for. Each set is yielded as a list of
+    ships in that order.
+
+    Keyword arguments:
+    region -- set of cells to tile
+    ships -- list of ships (each a collection of cells) to choose from
+    rotate -- function mapping (rotation, cell) to the rotated cell
+    limit -- stop after this many sets (default: 1, None for no limit)
+    shape -- function getting the cells of a ship, for ships that are
+             names for their shapes (default: ships are their cells)
+    """
+    if shape is None:
+        shape = lambda ship: ship
+    region = frozenset(region)
+    ships = list(reversed(ships))
+    shapes = [shape(ship) for ship in ships]
+    placements = [shipPlacements(region, cells, rotate) for cells in shapes]
+    found = 0
+    for code in range(1 << len(ships)):
+        if limit is not None and found >= limit:
+            return
+        # The first ship to be decided is the most significant bit
+        chosen = [i for i in range(len(ships)) if code & (1 << (len(ships) - 1 - i))]
+        if sum(len(shapes[i]) for i in chosen) != len(region):
+            continue
+        rows = [tuple(cells) + (("ship", i),) for i in chosen for cells in placements[i]]
+        problem = ExactCover(rows, sorted(region) + [("ship", i) for i in chosen])
+        if problem.first() is not None:
+            found += 1
+            yield [ships[i] for i in chosen]
@@ -0,0 +1,130 @@
+"""
+Immutable remaining-fleet values, for searches that drop ships as they go.
+
+A Fleet is a bitmask over a FleetTable, the fixed list of every ship type
+and its shape that all fleets of a kind share, so taking a ship away is
+one AND that makes a new Fleet and leaves the old one as it was. Nothing
+has to be copied to pass a fleet down a recursion, and fleets are
+hashable, so they can key caches directly.
+"""
+
+class FleetTable(object):
+    """
+    Every ship type of a fleet and its shape, in order.
+
+    Keyword arguments:
+    shapes -- sequence of (ship type, shape) pairs
+    """
+
+    def __init__(self, shapes):
+        self.shipTypes = tuple(shipType for shipType, _ in shapes)
+        self.shapes = dict(shapes)
+        self.bits = dict((shipType, 1 << i) for i, shipType in enumerate(self.shipTypes))
+        self.full = (1 << len(self.shipTypes)) - 1
+        self._orders = {}
+
+    def order(self, mask, backwards):
+        """
+        Get the ship types in mask as a tuple, in table order or backwards.
+        """
+        key = mask, backwards
+        try:
+            return self._orders[key]
+        except KeyError:
+            types = tuple(shipType for shipType in self.shipTypes
+                          if mask & self.bits[shipType])
+            order = self._orders[key] = types[::-1] if backwards else types
+            return order
+
+_tables = {}
+
+def getTable(shapes):
+    """
+    Get the FleetTable of shapes, building it the first time it is asked for.
+    """
+    shapes = list(shapes)
+    key = tuple((shipType, tuple(shape)) for shipType, shape in shapes)
+    try:
+        return _tables[key]
+    except KeyError:
+        table = _tables[key] = FleetTable(shapes)
+        return table
+
+class Fleet(object):
+    """
+    Some of the ship types of a FleetTable, in table order or backwards.
+    Iterates over, and is indexed by, ship type like the OrderedDict of
+    ship types to shapes it stands in for, but never changes: without and
+    reversedOrder give new Fleets. Fleets are equal when they hold the same
+    ship types in the same order.
+
+    Keyword arguments:
+    table -- the FleetTable
+    mask -- which ship types are in the fleet (default: all of them)
+    backwards -- whether to go through them backwards (default: False)
+    """
+
+    __slots__ = ("table", "mask", "backwards", "_types")
+
+    def __init__(self, table, mask=None, backwards=False):
+        self.table = table
+        self.mask = table.full if mask is None else mask
+        self.backwards = backwards
+        self._types = table.order(self.mask, backwards)
+
+    def without(self, shipType):
+        """
+        Get this fleet less shipType. Raises KeyError if it isn't in it.
+        """
+        bit = self.table.bits[shipType]
+        if not self.mask & bit:
+            raise KeyError(shipType)
+        return Fleet(self.table, self.mask & ~bit, self.backwards)
+
+    def reversedOrder(self):
+        return Fleet(self.table, self.mask, not self.backwards)
+
+    def __iter__(self):
+        return iter(self._types)
+
+    def __reversed__(self):
+        return reversed(self._types)
+
+    def __len__(self):
+        return len(self._types)
+
+    def __contains__(self, shipType):
+        return bool(self.mask & self.table.bits.get(shipType, 0))
+
+    def __getitem__(self, shipType):
+        if shipType not in self:
+            raise KeyError(shipType)
+        return self.table.shapes[shipType]
+
+    def keys(self):
+        return list(self._types)
+
+    def values(self):
+        return [self.table.shapes[shipType] for shipType in self._types]
+
+    def items(self):
+        return [(shipType, self.table.shapes[shipType]) for shipType in self._types]
+
+    def __eq__(self, other):
+        return (isinstance(other, Fleet) and self.table is other.table and
+                self._types == other._types)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self.table), self._types))
+
+    def __repr__(self):
+        return "Fleet(%r)" % (list(self._types),)
+
+def fullFleet(shapes):
+    """
+    Get the Fleet of every ship in shapes, a sequence of (ship type, shape) pairs.
+    """
+    return Fleet(getTable(shapes))
@@ -0,0 +1,153 @@
+"""
+The flood frontier: every empty cell next to a hit, kept up to date shot
+by shot so the next one to flood is always to hand.
+
+Each (hit, neighbour) pair on the frontier is a bit in one long integer,
+at a slot its priority function gives it, and the next cell is the one
+under the lowest set bit. Taking the lowest bit and clearing the bits of
+a cell once it is shot don't depend on how many cells there are, so
+flooding takes the same time however far into the game it is, where
+looking for a hit with an empty neighbour meant going over the board.
+
+Priorities map (frontier, hit, position, cell) to a slot, cell being the
+position-th of geometry.neighbours(hit). They are worked out when the hit
+is made, and lower slots come out first:
+
+    boardOrder -- the first hit in placements.CELLS order, and its first
+                  empty neighbour, as dominus has always flooded
+    recency    -- next to the latest hit first
+    densityOrder(levels) -- highest density count first, as counted when
+                  the hit was made, and then board order
+"""
+import const
+import geometry
+import placements
+
+CELL_INDEX = dict((cell, i) for i, cell in enumerate(placements.CELLS))
+# Slots for each hit, one per neighbour it can have
+WIDTH = len(geometry.NEIGHBOUR_OFFSETS)
+# Slots boardOrder and recency use
+SLOTS = WIDTH * len(placements.CELLS)
+
+def boardOrder(frontier, hit, position, cell):
+    return CELL_INDEX[hit] * WIDTH + position
+
+def recency(frontier, hit, position, cell):
+    # frontier.hits counts each cell once, so never passes len(CELLS)
+    return (len(placements.CELLS) - frontier.hits) * WIDTH + position
+
+def densityOrder(levels=16):
+    """
+    Get a priority ranking cells by frontier.density's count of them,
+    with counts of levels - 1 and over all counted as the highest. A
+    frontier with no density map is in board order.
+    """
+    def priority(frontier, hit, position, cell):
+        count = 0 if frontier.density is None else frontier.density.count(cell)
+        rank = levels - 1 - min(count, levels - 1)
+        return rank * SLOTS + boardOrder(frontier, hit, position, cell)
+    return priority
+
+class Frontier(object):
+    """
+    The empty cells next to the hits so far.
+
+    Keyword arguments:
+    priority -- function giving each (hit, neighbour) pair its slot
+                (default: boardOrder)
+    density -- density.DensityMap for priorities that score cells by it
+               (default: None)
+    """
+
+    __slots__ = ("priority", "density", "hits", "filled", "slots", "_cells", "_targets")
+
+    def __init__(self, priority=boardOrder, density=None):
+        self.priority = priority
+        self.density = density
+        self.hits = 0 # Cells hit
+        self.filled = 0 # Mask of every cell that has been shot
+        self.slots = 0 # Bit of every slot on the frontier
+        self._cells = {} # Cell -> bits of its slots
+        self._targets = {} # Slot -> cell, for the slots on the frontier
+
+    @classmethod
+    def fromBoard(cls, board, priority=boardOrder, density=None, moves=()):
+        """
+        Get the frontier of a base_player style board part way through a
+        round, with its hits made in the order they were shot.
+
+        Keyword arguments:
+        moves -- (cell, outcome) pairs of the latest shots, in the order
+                 they were made (default: none). Hits on the board that
+                 aren't among them count as made before all of them, in
+                 placements.CELLS order.
+        """
+        frontier = cls(priority, density)
+        later = set(cell for cell, outcome in moves if outcome == const.HIT)
+        for cell in placements.CELLS:
+            value = board[cell[0]][cell[1]]
+            if value == const.HIT:
+                if cell not in later:
+                    frontier.shoot(cell, True)
+            elif value != const.EMPTY:
+                frontier.shoot(cell, False)
+        for cell, outcome in moves:
+            if outcome == const.HIT:
+                frontier.shoot(cell, True)
+        return frontier
+
+    def _remove(self, cell):
+        bits = self._cells.pop(cell, 0)
+        self.slots &= ~bits
+        while bits:
+            low = bits & -bits
+            del self._targets[low.bit_length() - 1]
+            bits ^= low
+
+    def shoot(self, cell, hit):
+        """
+        Take cell off the frontier, now it has been shot, and if it was a
+        hit put its empty neighbours on. A cell shot again changes nothing.
+        """
+        bit = placements.CELL_BIT[cell]
+        if self.filled & bit:
+            return
+        self.filled |= bit
+        self._remove(cell)
+        if not hit:
+            return
+        self.hits += 1
+        for position, neighbour in enumerate(geometry.neighbours(cell)):
+            if self.filled & placements.CELL_BIT[neighbour]:
+                continue
+            slot = self.priority(self, cell, position, neighbour)
+            bit = 1 << slot
+            self._targets[slot] = neighbour
+            self._cells[neighbour] = self._cells.get(neighbour, 0) | bit
+            self.slots |= bit
+
+    def peek(self):
+        """
+        Get the next cell to flood, leaving it on the frontier, or None if
+        the frontier is empty.
+        """
+        slots = self.slots
+        if not slots:
+            return None
+        return self._targets[(slots & -slots).bit_length() - 1]
+
+    def pop(self):
+        """
+        Get the next cell to flood and take it off the frontier, or None if
+        the frontier is empty.
+        """
+        cell = self.peek()
+        if cell is not None:
+            self._remove(cell)
+        return cell
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __contains__(self, cell):
+        return cell in self._cells
@@ -0,0 +1,271 @@
+"""
+Append-only binary logs of a player's games, and replaying them.
+
+A log covers one match, from newPlayer on. Each record is a tag byte and
+its payload, so a move costs a few bytes:
+
+    P  uint16 length, JSON  match: player module, opponent, settings, heat map
+    R  uint64               round: the seed the player's generator was given
+    D  uint8 n, n cells     deployFleet: the cells occupied
+    C  cell                 chooseMove: the move chosen
+    H  cell / M  cell       setOutcome: hit or missed
+    O  cell                 getOpponentMove
+
+Cells are a byte each, their index in placements.CELLS, or NO_CELL for a
+move off the board. Records build up in a buffered file, which is only
+written out when the buffer fills, at the start of each round and on close.
+
+Replay rebuilds the player from a log, to any move, by seeding its
+generator (see seeding.py) as the log says and feeding the player every
+call it had. Wall-clock limits are switched off for the replay, so a game
+in which the player ran out of time can diverge from its log; divergences
+are reported rather than fatal, and the logged moves are the ones played on.
+
+Usage: python gamelog.py LOG [--move N [--profile]]
+"""
+import argparse
+import collections
+import cProfile
+import importlib
+import io
+import itertools
+import json
+import os
+import pstats
+import struct
+import time
+
+import match # Sets up const and base_player when the manager isn't around
+import const
+import placements
+import tournament
+
+MAGIC = "DOMLOG1\n"
+NO_CELL = 0xff
+BUFFER_SIZE = 1 << 16
+
+MATCH, ROUND, DEPLOY, CHOOSE, HIT, MISSED, OPPONENT = "PRDCHMO"
+
+LENGTH = struct.Struct("<H")
+SEED = struct.Struct("<Q")
+
+CELL_INDEX = dict((cell, i) for i, cell in enumerate(placements.CELLS))
+
+Event = collections.namedtuple("Event", ["tag", "value"])
+
+def encodeCell(cell):
+    try:
+        return chr(CELL_INDEX[tuple(cell)])
+    except (KeyError, TypeError, ValueError):
+        return chr(NO_CELL)
+
+def decodeCell(byte):
+    index = ord(byte)
+    return None if index == NO_CELL else placements.CELLS[index]
+
+class GameLog(object):
+    """
+    Writer for the log at path, which it creates.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = io.open(path, "wb", buffering=BUFFER_SIZE)
+        self._file.write(MAGIC)
+
+    def match(self, module, opponent, settings, heat=None):
+        """
+        Start the log with what the player was and what it knew.
+
+        Keyword arguments:
+        module -- name of the module the player came from
+        opponent -- name given to newPlayer
+        settings -- dict of the player's settings that differ between hosts
+        heat -- (rounds, counts) of the opponent's heat map, or None
+        """
+        header = json.dumps({"module": module, "opponent": opponent, "settings": settings,
+                             "heat": heat and [heat[0], list(heat[1])]})
+        self._file.write(MATCH + LENGTH.pack(len(header)) + header)
+
+    def round(self, seed):
+        self.flush()
+        self._file.write(ROUND + SEED.pack(seed))
+
+    def deploy(self, cells):
+        cells = sorted(cells)
+        self._file.write(DEPLOY + chr(len(cells)) + "".join(encodeCell(c) for c in cells))
+
+    def choose(self, cell):
+        self._file.write(CHOOSE + encodeCell(cell))
+
+    def outcome(self, outcome, cell):
+        self._file.write((HIT if outcome == const.HIT else MISSED) + encodeCell(cell))
+
+    def opponent(self, cell):
+        self._file.write(OPPONENT + encodeCell(cell))
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+_numbers = itertools.count()
+
+def openLog(directory):
+    """
+    Get a GameLog for a new match, in a file of its own in directory.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    name = "%s-%d-%d.domlog" % (time.strftime("%Y%m%d-%H%M%S"), os.getpid(), next(_numbers))
+    return GameLog(os.path.join(directory, name))
+
+def readEvents(path):
+    """
+    Generator for the Events of the log at path. value is the decoded
+    JSON for MATCH, the seed for ROUND, a list of cells for DEPLOY and a
+    cell (None off the board) for the rest. A record cut short at the end
+    of the file, as a crash can leave it, is dropped.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("%s is not a game log" % path)
+    i = len(MAGIC)
+    while i < len(data):
+        tag = data[i]
+        i += 1
+        if tag == MATCH:
+            if i + LENGTH.size > len(data):
+                return
+            length, = LENGTH.unpack_from(data, i)
+            i += LENGTH.size
+            if i + length > len(data):
+                return
+            value = json.loads(data[i:i + length])
+            i += length
+        elif tag == ROUND:
+            if i + SEED.size > len(data):
+                return
+            value, = SEED.unpack_from(data, i)
+            i += SEED.size
+        elif tag == DEPLOY:
+            if i >= len(data) or i + 1 + ord(data[i]) > len(data):
+                return
+            count = ord(data[i])
+            value = [decodeCell(byte) for byte in data[i + 1:i + 1 + count]]
+            i += 1 + count
+        elif tag in (CHOOSE, HIT, MISSED, OPPONENT):
+            if i >= len(data):
+                return
+            value = decodeCell(data[i])
+            i += 1
+        else:
+            raise ValueError("unknown record %r at byte %d of %s" % (tag, i - 1, path))
+        yield Event(tag, value)
+
+class Replay(object):
+    """
+    A log read into memory, ready to rebuild its player at any move.
+    Moves are numbered from 0 across the whole match, in the order the
+    player made them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.events = list(readEvents(path))
+        if not self.events or self.events[0].tag != MATCH:
+            raise ValueError("%s does not start with a match record" % path)
+        self.header = self.events[0].value
+        self.moves = sum(1 for event in self.events if event.tag == CHOOSE)
+        self.divergences = []
+
+    def newPlayer(self):
+        """
+        Get a player as the log's began: made, set up and given newPlayer.
+        """
+        player = importlib.import_module(self.header["module"]).getPlayer()
+        for name, value in self.header["settings"].items():
+            setattr(player, name, value)
+        for name in tournament.TIME_LIMITS:
+            if hasattr(player, name):
+                setattr(player, name, None)
+        player.newPlayer(self.header["opponent"])
+        if self.header["heat"] is not None:
+            player.heat.restore(*self.header["heat"])
+        return player
+
+    def player(self, move=None):
+        """
+        Get the player just before it chose move (or after the whole log,
+        for None). Any difference between what it does and what the log
+        says is added to self.divergences, as (move, what, logged, replayed).
+        """
+        self.divergences = []
+        player = self.newPlayer()
+        played = 0
+        for event in self.events[1:]:
+            if event.tag == ROUND:
+                player.seedRandom(event.value)
+                player.newRound()
+            elif event.tag == DEPLOY:
+                board = player.deployFleet()
+                cells = sorted(cell for cell in placements.CELLS
+                               if board[cell[0]][cell[1]] == const.OCCUPIED)
+                if cells != sorted(event.value):
+                    self.divergences.append((played, "deploy", event.value, cells))
+            elif event.tag == CHOOSE:
+                if played == move:
+                    return player
+                chosen = player.chooseMove()
+                chosen = tuple(chosen) if chosen is not None else None
+                if chosen in CELL_INDEX or event.value is not None:
+                    if chosen != event.value:
+                        self.divergences.append((played, "move", event.value, chosen))
+                played += 1
+            elif event.tag in (HIT, MISSED):
+                player.setOutcome(const.HIT if event.tag == HIT else const.MISSED,
+                                  event.value[0], event.value[1])
+            elif event.tag == OPPONENT:
+                player.getOpponentMove(event.value[0], event.value[1])
+        if move is not None and move != played:
+            raise IndexError("%s has %d moves, no move %d" % (self.path, played, move))
+        return player
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise or replay a game log.")
+    parser.add_argument("log")
+    parser.add_argument("--move", type=int, default=None,
+                        help="rebuild the player just before this move")
+    parser.add_argument("--profile", action="store_true",
+                        help="run chooseMove for --move under cProfile")
+    args = parser.parse_args(argv)
+
+    replay = Replay(args.log)
+    rounds = sum(1 for event in replay.events if event.tag == ROUND)
+    print "%s: %s against %r, %d rounds, %d moves, %d bytes" % (
+        args.log, replay.header["module"], replay.header["opponent"], rounds, replay.moves,
+        os.path.getsize(args.log))
+    player = replay.player(args.move)
+    for divergence in replay.divergences:
+        print "move %d: logged %s %s, replayed %s" % (divergence[0], divergence[1],
+                                                     divergence[2], divergence[3])
+    print "%d divergences" % len(replay.divergences)
+
+    if args.move is not None:
+        if args.profile:
+            profiler = cProfile.Profile()
+            chosen = profiler.runcall(player.chooseMove)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+        else:
+            start = time.time()
+            chosen = player.chooseMove()
+            print "chooseMove took %.1fms" % (1e3 * (time.time() - start))
+        print "move %d: %s" % (args.move, chosen)
+
+if __name__ == "__main__":
+    main()
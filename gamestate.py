@@ -0,0 +1,68 @@
+"""
+Compact containers for per-game state, for hosting many games at once.
+
+A Player lives as long as its match, and with thousands of matches live
+the list-of-lists boards and lists of nested tuples the players started
+with add up. These hold the same things in flat arrays, behind the same
+indexing and iteration the players already use.
+"""
+import array
+
+import const
+import placements
+
+CELL_INDEX = dict((cell, i) for i, cell in enumerate(placements.CELLS))
+
+# Boards hold const values, which fit in a byte as long as they are small ints
+_BOARD_TYPECODE = "B" if all(isinstance(value, int) and 0 <= value < 256 for value in
+                             (const.EMPTY, const.OCCUPIED, const.HIT, const.MISSED)) else None
+
+def compactBoard(board):
+    """
+    Get a base_player style board with each row an array rather than a
+    list, if the const values allow it, and board itself otherwise.
+    Indexed and assigned to as board[row][col] either way.
+    """
+    if _BOARD_TYPECODE is None:
+        return board
+    return [array.array(_BOARD_TYPECODE, row) for row in board]
+
+class MoveLog(object):
+    """
+    Our shots and their outcomes, one uint16 each. Stands in for a list of
+    ((row, col), outcome) pairs: append, len, indexing, iteration and
+    reversed all give and take pairs, with outcome const.HIT or const.MISSED.
+    """
+
+    __slots__ = ("codes",)
+
+    def __init__(self):
+        self.codes = array.array("H")
+
+    @staticmethod
+    def _decode(code):
+        return placements.CELLS[code >> 1], const.HIT if code & 1 else const.MISSED
+
+    def append(self, move):
+        cell, outcome = move
+        self.codes.append(CELL_INDEX[tuple(cell)] << 1 | (outcome == const.HIT))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self._decode(self.codes[i])
+
+    def __iter__(self):
+        for code in self.codes:
+            yield self._decode(code)
+
+    def __reversed__(self):
+        for code in reversed(self.codes):
+            yield self._decode(code)
+
+    def hits(self):
+        """
+        Get the cells shot that were hits, in the order they were shot.
+        """
+        return [placements.CELLS[code >> 1] for code in self.codes if code & 1]
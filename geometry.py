@@ -0,0 +1,121 @@
+"""
+Geometry of the L-shaped board, shared by every player.
+
+Rows 0-5 are 6 cells wide and rows 6-11 are 12 cells wide, 108 cells in all.
+Everything here is worked out once at import, so the functions are just
+lookups. Set DOMINUS_STRICT=1 in the environment to have them check their
+arguments as well, as the old per-player copies did.
+"""
+import os
+import random
+
+STRICT = bool(os.environ.get("DOMINUS_STRICT"))
+
+def _onBoard(cell):
+    if cell[0] < 0  or cell[1] < 0:  return False
+    if cell[0] > 11 or cell[1] > 11: return False
+    if cell[0] < 6 and cell[1] > 5:  return False
+    return True
+
+# Every valid cell, row by row
+CELLS = tuple((x, y) for x in range(12) for y in range(6 if x < 6 else 12))
+CELL_SET = frozenset(CELLS)
+
+# Offsets of the cells sharing an edge with a cell, in the order neighbours() gives them
+NEIGHBOUR_OFFSETS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+def _neighbours(cell):
+    return tuple(n for n in ((cell[0] + dx, cell[1] + dy) for dx, dy in NEIGHBOUR_OFFSETS)
+                 if n in CELL_SET)
+
+# The valid neighbours of each valid cell
+NEIGHBOURS = dict((cell, _neighbours(cell)) for cell in CELLS)
+
+# Rotations as (xx, xy, yx, yy), so rotation r takes (x, y) to
+# (xx * x + xy * y, yx * x + yy * y).
+# ROTATIONS are quarter turns, as used by dominus and the straw players.
+ROTATIONS = ((1, 0, 0, 1), (0, -1, 1, 0), (-1, 0, 0, -1), (0, 1, -1, 0))
+# VARIANT_ROTATIONS are what the other dominus* players have always used:
+# their rotation 1 is a reflection in the diagonal rather than a quarter turn.
+VARIANT_ROTATIONS = ((1, 0, 0, 1), (0, 1, 1, 0), (-1, 0, 0, -1), (0, 1, -1, 0))
+
+if STRICT:
+    assert len(CELLS) == 108
+    assert all(_onBoard(cell) for cell in CELLS)
+    assert all(cell in CELL_SET or not _onBoard(cell)
+               for cell in ((x, y) for x in range(-1, 13) for y in range(-1, 13)))
+
+def isValidCell(cell):
+    """
+    Check that a cell is on the board.
+    """
+    if STRICT:
+        assert type(cell) == tuple
+    return cell in CELL_SET
+
+def allCells():
+    """
+    Get every cell on the board, row by row.
+    """
+    return CELLS
+
+def neighbours(cell):
+    """
+    Get the cells on the board sharing an edge with cell.
+    cell itself may be off the board.
+    """
+    if STRICT:
+        assert type(cell) == tuple
+    try:
+        return NEIGHBOURS[cell]
+    except KeyError:
+        return _neighbours(cell)
+
+def getRandPiece(rng=random):
+    """
+    Get a random cell on the board, drawn with rng (default: the random module).
+    """
+    row = rng.randint(0, 11)
+    # Board is a weird L shape
+    col = rng.randint(0, 5 if row < 6 else 11)
+    # Return move in row (letter) + col (number) grid reference
+    # e.g. A3 is represented as 0,2
+    return (row, col)
+
+def _turn(rotation, cell):
+    xx, xy, yx, yy = rotation
+    return (xx * cell[0] + xy * cell[1], yx * cell[0] + yy * cell[1])
+
+def _rotationTable(rotations):
+    # Covers every difference between two cells on the board
+    span = range(-11, 12)
+    return tuple(dict(((x, y), _turn(rotation, (x, y))) for x in span for y in span)
+                 for rotation in rotations)
+
+_ROTATED = _rotationTable(ROTATIONS)
+_VARIANT_ROTATED = _rotationTable(VARIANT_ROTATIONS)
+
+def rotate(rotation, cell):
+    """
+    Turn cell a quarter turn about (0, 0) rotation times.
+    Raises IndexError for rotations outside 0-3.
+    """
+    if not 0 <= rotation <= 3:
+        # Negative rotations would index the table from the end
+        raise IndexError("rotation %r out of range" % (rotation,))
+    try:
+        return _ROTATED[rotation][cell]
+    except KeyError:
+        return _turn(ROTATIONS[rotation], cell)
+
+def rotateVariant(rotation, cell):
+    """
+    As rotate, but with the dominus* variants' rotations (see VARIANT_ROTATIONS).
+    Raises IndexError for rotations outside 0-3.
+    """
+    if not 0 <= rotation <= 3:
+        raise IndexError("rotation %r out of range" % (rotation,))
+    try:
+        return _VARIANT_ROTATED[rotation][cell]
+    except KeyError:
+        return _turn(VARIANT_ROTATIONS[rotation], cell)
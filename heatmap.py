@@ -0,0 +1,176 @@
+"""
+Per-opponent heat maps of where their ships have turned up.
+
+Each opponent gets a fixed-size record: how many rounds have been
+recorded, and for each cell how many of those rounds a ship of theirs was
+known to be there, from the ships we sank or the whole fleet once it was.
+Records live in a memory-mapped file, so they last from match to match
+and an update only touches the cells it changes, or in memory when there
+is no file.
+
+File layout: MAGIC, the number of cells, then one record after another,
+each the md5 of the opponent's name, the round count and a uint32 count
+per cell in placements.CELLS order.
+"""
+import array
+import hashlib
+import mmap
+import os
+import struct
+
+import placements
+
+MAGIC = "DOMHEAT1"
+HEADER = struct.Struct("<8sI")
+RECORD_HEAD = struct.Struct("<16sI")
+COUNT = struct.Struct("<I")
+CELL_COUNT = len(placements.CELLS)
+RECORD_SIZE = RECORD_HEAD.size + COUNT.size * CELL_COUNT
+
+CELL_INDEX = dict((cell, i) for i, cell in enumerate(placements.CELLS))
+
+class HeatMap(object):
+    """
+    The record of one opponent in a HeatStore. rounds and counts (an
+    array of one count per cell, in placements.CELLS order) are read once,
+    and kept in step with the store by addRound.
+    """
+
+    __slots__ = ("store", "offset", "rounds", "counts")
+
+    def __init__(self, store, offset):
+        self.store = store
+        self.offset = offset
+        _, self.rounds = RECORD_HEAD.unpack_from(store.data, offset)
+        start = offset + RECORD_HEAD.size
+        self.counts = array.array("I")
+        self.counts.fromstring(bytes(store.data[start:start + COUNT.size * CELL_COUNT]))
+        if struct.pack("=I", 1) != COUNT.pack(1):
+            self.counts.byteswap()
+
+    def addRound(self, cells):
+        """
+        Record a round in which the opponent had ships on cells.
+        """
+        data = self.store.data
+        self.rounds += 1
+        COUNT.pack_into(data, self.offset + RECORD_HEAD.size - COUNT.size, self.rounds)
+        start = self.offset + RECORD_HEAD.size
+        for cell in set(cells):
+            i = CELL_INDEX[cell]
+            self.counts[i] += 1
+            COUNT.pack_into(data, start + COUNT.size * i, self.counts[i])
+
+    def restore(self, rounds, counts):
+        """
+        Overwrite the record with rounds and counts, as saved from another
+        HeatMap's attributes.
+        """
+        data = self.store.data
+        self.rounds = rounds
+        COUNT.pack_into(data, self.offset + RECORD_HEAD.size - COUNT.size, rounds)
+        start = self.offset + RECORD_HEAD.size
+        for i, count in enumerate(counts):
+            self.counts[i] = count
+            COUNT.pack_into(data, start + COUNT.size * i, count)
+
+    def weights(self, strength=1.0, prior_rounds=5):
+        """
+        Get how much more often than average the opponent has had a ship
+        on each cell, raised to the power strength, in placements.CELLS order.
+
+        Keyword arguments:
+        strength -- how far to trust the history (default: 1.0, 0 for not at all)
+        prior_rounds -- rounds of average behaviour to pretend came first,
+                        so a few rounds can't swing the weights too far
+                        (default: 5)
+        """
+        total = sum(self.counts)
+        if not self.rounds or not total:
+            return [1.0] * CELL_COUNT
+        average = float(total) / (self.rounds * CELL_COUNT)
+        prior = prior_rounds * average
+        rounds = self.rounds + prior_rounds
+        return [((count + prior) / rounds / average) ** strength for count in self.counts]
+
+class HeatStore(object):
+    """
+    The heat maps of every opponent, in the file at path, or in memory if
+    path is None. Only one process should have a file open at a time.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.maps = {}
+        self._file = None
+        if path is None:
+            self.data = bytearray(HEADER.pack(MAGIC, CELL_COUNT))
+        else:
+            if not os.path.exists(path) or not os.path.getsize(path):
+                with open(path, "wb") as f:
+                    f.write(HEADER.pack(MAGIC, CELL_COUNT))
+            self._file = open(path, "r+b")
+            self._map()
+            magic, cells = HEADER.unpack_from(self.data, 0)
+            if magic != MAGIC or cells != CELL_COUNT:
+                raise ValueError("%s is not a heat map file" % path)
+
+        self._offsets = {}
+        for offset in range(HEADER.size, len(self.data), RECORD_SIZE):
+            key, _ = RECORD_HEAD.unpack_from(self.data, offset)
+            self._offsets[key] = offset
+
+    def _map(self):
+        self.data = mmap.mmap(self._file.fileno(), 0)
+
+    def get(self, name):
+        """
+        Get the HeatMap of the opponent called name, adding an empty one
+        if there isn't one yet.
+        """
+        if isinstance(name, unicode):
+            name = name.encode("utf-8")
+        key = hashlib.md5(name).digest()
+        try:
+            return self.maps[key]
+        except KeyError:
+            pass
+        if key not in self._offsets:
+            record = RECORD_HEAD.pack(key, 0) + "\0" * (COUNT.size * CELL_COUNT)
+            if self._file is None:
+                self._offsets[key] = len(self.data)
+                self.data.extend(record)
+            else:
+                self.data.close()
+                self._file.seek(0, os.SEEK_END)
+                self._offsets[key] = self._file.tell()
+                self._file.write(record)
+                self._file.flush()
+                self._map()
+        heat = self.maps[key] = HeatMap(self, self._offsets[key])
+        return heat
+
+    def flush(self):
+        if self._file is not None:
+            self.data.flush()
+
+    def close(self):
+        if self._file is not None:
+            self.data.close()
+            self._file.close()
+            self._file = None
+
+_stores = {}
+
+def openStore(path=None):
+    """
+    Get the HeatStore for path, opening it the first time. None gets a
+    fresh in-memory store every time.
+    """
+    if path is None:
+        return HeatStore()
+    try:
+        return _stores[path]
+    except KeyError:
+        store = _stores[path] = HeatStore(path)
+        return store
@@ -0,0 +1,136 @@
+"""
+Headless match runner, standing in for HackSoc/BlottleshipsManager.
+
+Drives any two modules exposing getPlayer() through deployFleet, newRound,
+newPlayer, chooseMove, setOutcome and getOpponentMove the way the manager
+does, with no I/O. Uses the manager's const and base_player if they can
+be imported, and the copies in standin/ otherwise.
+
+Usage: python match.py dominus dominusWallpaper --rounds 100 --seed 1
+"""
+import argparse
+import collections
+import copy
+import importlib
+import os
+import random
+import sys
+
+try:
+    import const
+    import base_player
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "standin"))
+    import const
+    import base_player
+
+FLEET_SIZE = 21 # Cells occupied by a full fleet
+MAX_MOVES = 500 # Per player per round, in case neither side can finish
+
+RoundResult = collections.namedtuple("RoundResult", ["winner", "moves", "hits"])
+
+def isValidCell(cell):
+    try:
+        row, col = cell
+    except (TypeError, ValueError):
+        return False
+    if not isinstance(row, int) or not isinstance(col, int):
+        return False
+    if row < 0 or col < 0 or row > 11 or col > 11:
+        return False
+    return row >= 6 or col <= 5
+
+def loadPlayer(module_name):
+    """
+    Import a player module by name and get a fresh player from it.
+    """
+    return importlib.import_module(module_name).getPlayer()
+
+def checkFleet(board):
+    """
+    Check a board returned by deployFleet, and get the set of cells it occupies.
+    """
+    occupied = set()
+    for row in range(12):
+        for col in range(6 if row < 6 else 12):
+            if board[row][col] == const.OCCUPIED:
+                occupied.add((row, col))
+    if len(occupied) != FLEET_SIZE:
+        raise ValueError("Fleet occupies %d cells, expected %d" % (len(occupied), FLEET_SIZE))
+    return occupied
+
+def playRound(players, first=0):
+    """
+    Play one round between two players that have already had newPlayer called.
+
+    Keyword arguments:
+    players -- the two players
+    first -- index of the player who shoots first
+
+    Returns a RoundResult. winner is the index of the winning player,
+    or None if both ran out of moves.
+    """
+    fleets = []
+    for player in players:
+        player.newRound()
+        fleets.append(checkFleet(copy.deepcopy(player.deployFleet())))
+
+    hits = [set(), set()]
+    moves = [0, 0]
+    turn = first
+    while moves[0] < MAX_MOVES or moves[1] < MAX_MOVES:
+        shooter, target = players[turn], players[1 - turn]
+        move = shooter.chooseMove()
+        moves[turn] += 1
+        if isValidCell(move):
+            row, col = move
+            if (row, col) in fleets[1 - turn]:
+                hits[turn].add((row, col))
+                outcome = const.HIT
+            else:
+                outcome = const.MISSED
+            target.getOpponentMove(row, col)
+            shooter.setOutcome(outcome, row, col)
+            if len(hits[turn]) == FLEET_SIZE:
+                return RoundResult(turn, tuple(moves), tuple(len(h) for h in hits))
+        turn = 1 - turn
+    return RoundResult(None, tuple(moves), tuple(len(h) for h in hits))
+
+def playMatch(module_a, module_b, rounds=1, seed=None):
+    """
+    Play a match of several rounds between two player modules,
+    alternating who shoots first. Returns the list of RoundResults.
+    """
+    if seed is not None:
+        random.seed(seed)
+    players = [loadPlayer(module_a), loadPlayer(module_b)]
+    try:
+        players[0].newPlayer(players[1].getName())
+        players[1].newPlayer(players[0].getName())
+        return [playRound(players, first=i % 2) for i in range(rounds)]
+    finally:
+        closePlayers(players)
+
+def closePlayers(players):
+    """
+    Call close on every player that has it, once they have finished playing.
+    """
+    for player in players:
+        if hasattr(player, "close"):
+            player.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play bots against each other locally.")
+    parser.add_argument("player_a")
+    parser.add_argument("player_b")
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    results = playMatch(args.player_a, args.player_b, args.rounds, args.seed)
+    wins = collections.Counter(result.winner for result in results)
+    print "%s %d - %d %s (%d unfinished)" % (args.player_a, wins[0], wins[1],
+                                            args.player_b, wins[None])
+
+if __name__ == "__main__":
+    main()
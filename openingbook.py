@@ -0,0 +1,140 @@
+"""
+Opening book for dominus's hunt phase.
+
+While hunting, dominus.find shoots at random among the cells of highest
+density, and that density depends only on which cells have been shot and
+which ship types are left. So for the first few shots of a game it can be
+worked out in advance: the book maps (ship types left, cells shot) to the
+cells find would choose between, for every sequence of misses find could
+play up to a given depth.
+
+Build it with: python openingbook.py --depth 10
+"""
+import argparse
+import binascii
+import itertools
+import os
+import struct
+
+import density
+import placements
+
+MAGIC = "DOMBOOK1"
+RECORD = struct.Struct("<B14s14s")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dominus.book")
+
+def fleetKey(shipTypes, allTypes):
+    """
+    Get the byte standing for a collection of ship types, with a bit for
+    each of allTypes (up to eight) in sorted order.
+    """
+    allTypes = sorted(allTypes)
+    key = 0
+    for shipType in shipTypes:
+        key |= 1 << allTypes.index(shipType)
+    return key
+
+def _pack(mask):
+    return binascii.unhexlify("%028x" % mask)
+
+def _unpack(data):
+    return int(binascii.hexlify(data), 16)
+
+def build(table, fleets, depth, limit=20000):
+    """
+    Get the book entries for every sequence of up to depth misses find
+    could play against each fleet, as a dict of (fleetKey, shot mask) to
+    the mask of the cells find would choose between.
+
+    Keyword arguments:
+    table -- density.DensityTable find counts with
+    fleets -- collections of ship types to build for
+    depth -- how many shots into the game to go
+    limit -- most positions to add for one fleet at one depth (default: 20000).
+             Small fleets tie across much of the board, and stop short of
+             depth rather than go past this.
+    """
+    book = {}
+    for shipTypes in fleets:
+        key = fleetKey(shipTypes, table.shipTypes)
+        level = set([0])
+        for _ in range(depth):
+            if len(level) > limit:
+                break
+            next_level = set()
+            for shot in level:
+                _, counts = density.count(table, shipTypes, shot)
+                best_count, cells = density.best(counts)
+                if not best_count:
+                    continue
+                choices = 0
+                for cell in cells:
+                    choices |= placements.CELL_BIT[cell]
+                    next_level.add(shot | placements.CELL_BIT[cell])
+                book[key, shot] = choices
+            level = next_level
+    return book
+
+def save(book, path):
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(book)))
+        for (key, shot), choices in sorted(book.iteritems()):
+            f.write(RECORD.pack(key, _pack(shot), _pack(choices)))
+
+_books = {}
+
+def load(path=DEFAULT_PATH):
+    """
+    Get the book stored at path, as a dict of (fleetKey, shot mask) to the
+    list of cells to choose between, in placements.CELLS order. A missing
+    book is empty. Books are only read once per process.
+    """
+    try:
+        return _books[path]
+    except KeyError:
+        pass
+    book = {}
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("%s is not an opening book" % path)
+        count, = struct.unpack_from("<I", data, len(MAGIC))
+        offset = len(MAGIC) + 4
+        for _ in range(count):
+            key, shot, choices = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            choices = _unpack(choices)
+            book[key, _unpack(shot)] = [cell for cell in placements.CELLS
+                                        if choices & placements.CELL_BIT[cell]]
+    _books[path] = book
+    return book
+
+def main(argv=None):
+    import match # Sets up const and base_player when the manager isn't around
+    import dominus
+
+    parser = argparse.ArgumentParser(description="Build the dominus opening book.")
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--all-fleets", action="store_true",
+                        help="build for every subset of the fleet, not just the whole fleet")
+    parser.add_argument("--limit", type=int, default=20000,
+                        help="most positions per fleet and depth")
+    parser.add_argument("--out", default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+
+    player = dominus.getPlayer()
+    shipTypes = list(player.allshapes)
+    if args.all_fleets:
+        fleets = [subset for size in range(len(shipTypes), 0, -1)
+                  for subset in itertools.combinations(shipTypes, size)]
+    else:
+        fleets = [shipTypes]
+    book = build(density.getTable(player.catalog), fleets, args.depth, args.limit)
+    save(book, args.out)
+    print "%d positions written to %s" % (len(book), args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import collections
+
+import geometry
+
+# Every valid cell on the L-shaped board, in the same order as Player.allCells()
+CELLS = geometry.CELLS
+CELL_SET = geometry.CELL_SET
+# Bit position of each valid cell, for bitboards
+CELL_BIT = dict((cell, 1 << i) for i, cell in enumerate(CELLS))
+
+Placement = collections.namedtuple("Placement",
+                                   ["shipType", "rotation", "anchor", "cells", "cellSet", "mask"])
+
+class Catalog(object):
+    """
+    Immutable catalog of every legal (ship type, rotation, anchor) placement.
+
+    placements -- every placement, ordered by anchor, then ship type, then rotation
+    atAnchor   -- atAnchor[shipType][anchor] is the tuple of placements (one per
+                  legal rotation) whose (0, 0) cell sits on anchor
+    covering   -- covering[shipType][cell] is the tuple of placements containing
+                  cell, in the order produced by rotating the shape and then
+                  pivoting it about each of its cells in turn
+    """
+
+    def __init__(self, shapes, rotate):
+        shapes = [(shipType, tuple(shape)) for shipType, shape in shapes]
+        self.shipTypes = tuple(shipType for shipType, _ in shapes)
+
+        byKey = {}
+        for shipType, shape in shapes:
+            for rotation in range(4):
+                rotated = [rotate(rotation, cell) for cell in shape]
+                for anchor in CELLS:
+                    cells = tuple((anchor[0] + cx, anchor[1] + cy) for cx, cy in rotated)
+                    if all(cell in CELL_SET for cell in cells):
+                        mask = 0
+                        for cell in cells:
+                            mask |= CELL_BIT[cell]
+                        byKey[shipType, rotation, anchor] = Placement(
+                            shipType, rotation, anchor, cells, frozenset(cells), mask)
+
+        self.placements = tuple(byKey[shipType, rotation, anchor]
+                                for anchor in CELLS
+                                for shipType in self.shipTypes
+                                for rotation in range(4)
+                                if (shipType, rotation, anchor) in byKey)
+
+        self.atAnchor = {}
+        self.covering = {}
+        for shipType, shape in shapes:
+            atAnchor = self.atAnchor[shipType] = {}
+            for anchor in CELLS:
+                atAnchor[anchor] = tuple(byKey[shipType, rotation, anchor]
+                                         for rotation in range(4)
+                                         if (shipType, rotation, anchor) in byKey)
+
+            covering = self.covering[shipType] = dict((cell, []) for cell in CELLS)
+            for rotation in range(4):
+                rotated = [rotate(rotation, cell) for cell in shape]
+                for cell in CELLS:
+                    for ox, oy in rotated:
+                        placement = byKey.get((shipType, rotation, (cell[0] - ox, cell[1] - oy)))
+                        if placement is not None:
+                            covering[cell].append(placement)
+            for cell in CELLS:
+                covering[cell] = tuple(covering[cell])
+
+_catalogs = {}
+
+def getCatalog(shapes, rotate):
+    """
+    Get the catalog for a fleet, building it the first time it is asked for.
+
+    Keyword arguments:
+    shapes -- sequence of (ship type, list of cells) pairs
+    rotate -- function mapping (rotation, cell) to the rotated cell
+    """
+    key = (tuple((shipType, tuple(shape)) for shipType, shape in shapes), rotate)
+    try:
+        return _catalogs[key]
+    except KeyError:
+        catalog = _catalogs[key] = Catalog(shapes, rotate)
+        return catalog
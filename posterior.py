@@ -0,0 +1,223 @@
+"""
+Monte Carlo targeting: sample whole fleets that agree with what we know
+about the opponent's board, and shoot where ships turn up most often.
+
+Unlike a density map, which counts each ship type's placements on their
+own, every sample is a full fleet of non-overlapping ships, so cells that
+only fit a ship by overlapping another get no credit.
+"""
+import multiprocessing
+import random
+
+import placements
+
+CELL_COUNT = len(placements.CELLS)
+
+# Draws per fleet wanted before giving up, and draws that must all fail
+# before deciding the board can't be matched at all
+TRIES = 4
+GIVE_UP = 50
+
+_tables = {}
+
+def _getTables(catalog):
+    """
+    Get the placement masks of each ship type, and of each ship type
+    covering each cell (by index into placements.CELLS).
+    """
+    try:
+        return _tables[catalog]
+    except KeyError:
+        masks = {}
+        covering = {}
+        for shipType in catalog.shipTypes:
+            masks[shipType] = tuple(p.mask for p in catalog.placements if p.shipType == shipType)
+            covering[shipType] = tuple(tuple(p.mask for p in catalog.covering[shipType][cell])
+                                       for cell in placements.CELLS)
+        tables = _tables[catalog] = masks, covering
+        return tables
+
+def _drawFleet(free, covering, shipTypes, hits, rng):
+    occupied = 0
+    remaining = list(shipTypes)
+    uncovered = hits
+    while uncovered:
+        index = (uncovered & -uncovered).bit_length() - 1
+        options = [(shipType, mask) for shipType in remaining
+                   for mask in covering(shipType, index) if not mask & occupied]
+        if not options:
+            return None
+        shipType, mask = options[rng.randrange(len(options))]
+        remaining.remove(shipType)
+        occupied |= mask
+        uncovered &= ~mask
+
+    rng.shuffle(remaining)
+    for shipType in remaining:
+        masks = free[shipType]
+        if not masks:
+            return None
+        # Most placements miss the few ships already down, so try a few at random first
+        for _ in range(8):
+            mask = masks[rng.randrange(len(masks))]
+            if not mask & occupied:
+                break
+        else:
+            options = [mask for mask in masks if not mask & occupied]
+            if not options:
+                return None
+            mask = options[rng.randrange(len(options))]
+        occupied |= mask
+    return occupied
+
+def sampleFleets(catalog, shipTypes, hits, blocked, count, rng=random):
+    """
+    Draw up to count fleets of shipTypes covering every cell in hits and
+    none in blocked, each as the mask of the cells it occupies.
+
+    Ships are first put over the hits, one uncovered hit at a time, and the
+    rest are then placed anywhere they fit. Draws that paint themselves into
+    a corner are thrown away, so fewer than count fleets may come back, and
+    none if the board can't be matched.
+
+    Keyword arguments:
+    catalog -- placements.Catalog of the fleet
+    shipTypes -- the ship types still afloat
+    hits -- mask of the hits that no sunk ship accounts for
+    blocked -- mask of the cells no ship can be on (misses and sunk ships)
+    count -- how many fleets to draw
+    rng -- random.Random to draw with (default: the random module)
+    """
+    masks, covering = _getTables(catalog)
+    free = dict((shipType, [mask for mask in masks[shipType] if not mask & blocked])
+                for shipType in shipTypes)
+    freeCovering = {}
+    def coveringFree(shipType, index):
+        try:
+            return freeCovering[shipType, index]
+        except KeyError:
+            options = freeCovering[shipType, index] = [mask for mask in covering[shipType][index]
+                                                       if not mask & blocked]
+            return options
+
+    fleets = []
+    for tries in range(1, count * TRIES + 1):
+        fleet = _drawFleet(free, coveringFree, shipTypes, hits, rng)
+        if fleet is not None:
+            fleets.append(fleet)
+            if len(fleets) == count:
+                break
+        elif not fleets and tries >= GIVE_UP:
+            break
+    return fleets
+
+def _sampleBatch(args):
+    shapes, rotate, shipTypes, hits, blocked, count, seed = args
+    return sampleFleets(placements.getCatalog(shapes, rotate), shipTypes, hits, blocked,
+                        count, random.Random(seed))
+
+class PosteriorSampler(object):
+    """
+    Keeps a pool of sampled fleets that agree with the board, dropping the
+    ones that stop agreeing as shots come in and topping it back up.
+
+    Keyword arguments:
+    shapes -- sequence of (ship type, list of cells) pairs
+    rotate -- function mapping (rotation, cell) to the rotated cell
+    samples -- how many fleets to keep (default: 1000)
+    processes -- processes to draw with when at least batch_size fleets are
+                 needed at once (default: 1, drawing in this process)
+    rng -- random.Random to draw with (default: the random module)
+    """
+
+    batch_size = 2000
+
+    def __init__(self, shapes, rotate, samples=1000, processes=1, rng=random):
+        self.shapes = tuple((shipType, tuple(shape)) for shipType, shape in shapes)
+        self.rotate = rotate
+        self.catalog = placements.getCatalog(self.shapes, rotate)
+        self.samples = samples
+        self.processes = processes
+        self.rng = rng
+        self.fleets = []
+        self.drawn = 0 # Fleets drawn, as opposed to kept from earlier turns
+        self._key = None
+        self._pool = None
+
+    def update(self, shipTypes, hits, blocked):
+        """
+        Bring the samples in line with the board: keep those still covering
+        every hit and missing every blocked cell, and draw more to make up
+        the numbers. Everything is redrawn when the ship types change.
+        """
+        shipTypes = tuple(shipTypes)
+        if shipTypes != self._key:
+            self._key = shipTypes
+            self.fleets = []
+        else:
+            self.fleets = [fleet for fleet in self.fleets
+                           if not fleet & blocked and fleet & hits == hits]
+
+        needed = self.samples - len(self.fleets)
+        if needed <= 0:
+            return
+        kept = len(self.fleets)
+        if self.processes > 1 and needed >= self.batch_size:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.processes)
+            share = -(-needed // self.processes)
+            batches = [(self.shapes, self.rotate, shipTypes, hits, blocked, share,
+                        self.rng.getrandbits(64)) for _ in range(self.processes)]
+            for fleets in self._pool.map(_sampleBatch, batches):
+                self.fleets.extend(fleets)
+        else:
+            self.fleets.extend(sampleFleets(self.catalog, shipTypes, hits, blocked, needed,
+                                            self.rng))
+        self.drawn += len(self.fleets) - kept
+
+    def counts(self):
+        """
+        Get how many samples have a ship on each cell, in placements.CELLS order.
+        """
+        counts = [0] * CELL_COUNT
+        for fleet in self.fleets:
+            while fleet:
+                bit = fleet & -fleet
+                counts[bit.bit_length() - 1] += 1
+                fleet ^= bit
+        return counts
+
+    def best(self, shipTypes, hits, blocked, candidates=None):
+        """
+        Get the most samples any empty cell has a ship on, and the cells
+        with that many, in placements.CELLS order.
+
+        Keyword arguments:
+        shipTypes -- the ship types still afloat
+        hits -- mask of the hits that no sunk ship accounts for
+        blocked -- mask of the misses and the cells of sunk ships
+        candidates -- cells to choose from (default: every cell not in hits or blocked)
+        """
+        self.update(shipTypes, hits, blocked)
+        counts = self.counts()
+        if candidates is None:
+            shot = hits | blocked
+            candidates = [cell for cell in placements.CELLS
+                          if not placements.CELL_BIT[cell] & shot]
+        best_count, best_cells = 0, []
+        for cell in candidates:
+            count = counts[placements.CELL_BIT[cell].bit_length() - 1]
+            if count > best_count:
+                best_count, best_cells = count, [cell]
+            elif count == best_count and count:
+                best_cells.append(cell)
+        return best_count, sorted(best_cells)
+
+    def close(self):
+        """
+        Shut down the process pool, if there is one.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
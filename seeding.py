@@ -0,0 +1,37 @@
+"""
+A random number generator of its own for each Player.
+
+Players that draw from the random module share one stream, so in a
+process hosting several players each one's choices depend on how many
+numbers the others drew, and nothing can be replayed or run side by side
+in threads and still come out the same.
+"""
+import random
+
+import geometry
+
+class SeededPlayer(object):
+    """
+    Mixin for a Player whose random choices all come from self.rng, a
+    random.Random of its own, set up by initRandom. Unless given a seed it
+    is seeded from the random module, so seeding random before making the
+    players still makes a run repeatable.
+    """
+
+    def initRandom(self, seed=None):
+        self.rng = random.Random(random.getrandbits(64) if seed is None else seed)
+
+    def seedRandom(self, seed):
+        self.rng.seed(seed)
+
+    def getRandomState(self):
+        """
+        Get a snapshot of the generator, for setRandomState.
+        """
+        return self.rng.getstate()
+
+    def setRandomState(self, state):
+        self.rng.setstate(state)
+
+    def getRandPiece(self):
+        return geometry.getRandPiece(self.rng)
@@ -0,0 +1,465 @@
+"""
+Match server, hosting any number of players over TCP or Unix sockets.
+
+Each connection gets its own player, made with getPlayer() from one of
+the modules the server was started with, and drives it one line at a
+time. Requests and replies are single lines of space-separated words:
+
+    PLAYER module [opponent]  -> OK name       new player, then newPlayer(opponent)
+    ROUND                     -> OK            newRound
+    DEPLOY                    -> FLEET r,c ... deployFleet, the occupied cells
+    MOVE                      -> MOVE r c      chooseMove
+    OUTCOME HIT|MISSED r c    -> OK            setOutcome of our last move
+    OPPONENT r c              -> HIT|MISSED    getOpponentMove
+    STATS                     -> STATS key=value ...
+    QUIT                      -> BYE
+
+Anything that goes wrong gets ERROR and a message, and the connection
+carries on. Connections are served by an asyncore event loop; DEPLOY and
+MOVE, which can take as long as a whole panicAttack search, run on a
+bounded pool of worker threads, so a long search doesn't hold up the
+other connections' replies until it finishes. The threads share the GIL
+with the loop and with each other, though: searches take turns rather
+than running in parallel, and slow the loop down while they run. For
+moves on more than one core, start a server per core. A connection's
+requests are answered in order, one at a time.
+
+Usage: python server.py --port 7000 --modules dominus dominusWallpaper --workers 4
+       python server.py --unix /tmp/dominus.sock
+"""
+import argparse
+import asynchat
+import asyncore
+import collections
+import copy
+import importlib
+import os
+import Queue
+import socket
+import sys
+import threading
+import time
+import traceback
+
+import match # Sets up const and base_player when the manager isn't around
+import const
+import geometry
+
+OUTCOMES = {"HIT": const.HIT, "MISSED": const.MISSED}
+OUTCOME_NAMES = dict((value, name) for name, value in OUTCOMES.items())
+
+class ProtocolError(Exception):
+    """
+    Raised for a request the server can't make sense of. The message is
+    sent back to the client.
+    """
+    pass
+
+class Busy(Exception):
+    """
+    Raised by WorkerPool.submit when its queue is full.
+    """
+    pass
+
+class Latency(object):
+    """
+    Time from receiving each request to sending its reply, as a count,
+    total and worst case and a histogram bucketed by the power of two
+    microseconds each time falls under.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.worst = 0.0
+        self.histogram = collections.Counter()
+
+    def record(self, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.worst = max(self.worst, seconds)
+        self.histogram[1 << int(seconds * 1e6).bit_length()] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.seconds += other.seconds
+        self.worst = max(self.worst, other.worst)
+        self.histogram.update(other.histogram)
+
+    def percentile(self, fraction):
+        """
+        Get the upper bound, in seconds, of the histogram bucket holding
+        the given fraction of requests (at most the worst case), or 0 with
+        no requests.
+        """
+        seen = 0
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= fraction * self.count:
+                return min(bucket / 1e6, self.worst)
+        return 0.0
+
+    def summary(self):
+        return collections.OrderedDict([
+            ("requests", self.count),
+            ("mean_ms", 1e3 * self.seconds / self.count if self.count else 0.0),
+            ("p90_ms", 1e3 * self.percentile(0.9)),
+            ("max_ms", 1e3 * self.worst),
+        ])
+
+class WorkerPool(object):
+    """
+    Threads running jobs off a bounded queue, handing each result back to
+    the event loop to deliver. Jobs are Python code holding the GIL, so
+    the threads interleave the jobs with each other and with the loop.
+    They aren't parallel, and more workers only means more jobs in flight.
+
+    Keyword arguments:
+    workers -- number of threads
+    max_queue -- most jobs waiting for a thread before submit raises Busy
+    """
+
+    def __init__(self, workers=4, max_queue=64):
+        self.workers = workers
+        self.running = 0
+        self._jobs = Queue.Queue(max_queue)
+        self._done = collections.deque()
+        self._lock = threading.Lock()
+        self._waker = _Waker(self._done)
+        self._threads = []
+        for _ in range(workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def queued(self):
+        return self._jobs.qsize()
+
+    def submit(self, job, callback):
+        """
+        Run job() on a worker, then callback(result, error) on the event
+        loop, where error is the exception job raised, or None.
+        """
+        try:
+            self._jobs.put_nowait((job, callback))
+        except Queue.Full:
+            raise Busy("server busy, %d requests queued" % self._jobs.maxsize)
+
+    def _work(self):
+        while True:
+            job, callback = self._jobs.get()
+            with self._lock:
+                self.running += 1
+            try:
+                result, error = job(), None
+            except Exception as e:
+                result, error = None, e
+            with self._lock:
+                self.running -= 1
+            self._done.append((callback, result, error))
+            self._waker.wake()
+
+class _Waker(asyncore.file_dispatcher):
+    """
+    The read end of a pipe in the event loop. Workers write a byte to it
+    after finishing a job, and the loop then runs the finished callbacks.
+    """
+
+    def __init__(self, done):
+        self._done = done
+        read_fd, self._write_fd = os.pipe()
+        asyncore.file_dispatcher.__init__(self, read_fd)
+        os.close(read_fd) # file_dispatcher keeps its own copy
+
+    def writable(self):
+        return False
+
+    def wake(self):
+        os.write(self._write_fd, "x")
+
+    def handle_read(self):
+        self.recv(4096)
+        while self._done:
+            callback, result, error = self._done.popleft()
+            callback(result, error)
+
+class Connection(asynchat.async_chat):
+    """
+    One client and its player.
+    """
+
+    def __init__(self, sock, server):
+        asynchat.async_chat.__init__(self, sock)
+        self.set_terminator("\n")
+        self.server = server
+        self.player = None
+        self.latency = Latency()
+        self.pending = False # Whether a request is waiting on a worker
+        self._buffer = []
+        self._requests = collections.deque()
+        self.commands = {
+            "PLAYER": self.cmdPlayer,
+            "ROUND": self.cmdRound,
+            "DEPLOY": self.cmdDeploy,
+            "MOVE": self.cmdMove,
+            "OUTCOME": self.cmdOutcome,
+            "OPPONENT": self.cmdOpponent,
+            "STATS": self.cmdStats,
+            "QUIT": self.cmdQuit,
+        }
+
+    def readable(self):
+        # Leave further requests unread until this one is answered
+        return not self.pending and asynchat.async_chat.readable(self)
+
+    def collect_incoming_data(self, data):
+        self._buffer.append(data)
+
+    def found_terminator(self):
+        line = "".join(self._buffer).strip()
+        self._buffer = []
+        if line:
+            self._requests.append((line, time.time()))
+            self.handleRequests()
+
+    def handleRequests(self):
+        while self._requests and not self.pending and self.connected:
+            line, received = self._requests.popleft()
+            words = line.split()
+            try:
+                command = self.commands.get(words[0].upper())
+                if command is None:
+                    raise ProtocolError("unknown command %s" % words[0])
+                reply = command(received, *words[1:])
+            except (ProtocolError, Busy) as e:
+                reply = "ERROR %s" % e
+            except Exception as e:
+                traceback.print_exc()
+                reply = "ERROR %s: %s" % (type(e).__name__, e)
+            if reply is not None:
+                self.reply(reply, received)
+
+    def reply(self, text, received):
+        self.latency.record(time.time() - received)
+        self.push(text + "\n")
+
+    def offload(self, received, job, format_result):
+        """
+        Run job on the worker pool and reply with format_result(result)
+        when it is done. Returns None, for handleRequests to send nothing yet.
+        """
+        def done(result, error):
+            self.pending = False
+            if not self.connected:
+                # close left the player to us, as the job was still using it
+                self.closePlayer()
+                return
+            if error is None:
+                self.reply(format_result(result), received)
+            else:
+                self.reply("ERROR %s: %s" % (type(error).__name__, error), received)
+            self.handleRequests()
+        self.server.pool.submit(job, done)
+        self.pending = True
+        return None
+
+    def requirePlayer(self):
+        if self.player is None:
+            raise ProtocolError("no player, send PLAYER first")
+        return self.player
+
+    @staticmethod
+    def parseCell(row, col):
+        """
+        Get the cell row col names. Raises ProtocolError unless it is on
+        the board, before it can get anywhere near the player.
+        """
+        try:
+            cell = int(row), int(col)
+        except ValueError:
+            raise ProtocolError("bad cell %s %s" % (row, col))
+        if not geometry.isValidCell(cell):
+            raise ProtocolError("cell %d %d is off the board" % cell)
+        return cell
+
+    ###### Commands ######
+
+    def cmdPlayer(self, received, module=None, *opponent):
+        if module not in self.server.modules:
+            raise ProtocolError("module must be one of %s" % " ".join(self.server.modules))
+        self.closePlayer()
+        self.player = importlib.import_module(module).getPlayer()
+        if self.server.log_dir is not None and hasattr(self.player, "log_dir"):
+            self.player.log_dir = self.server.log_dir
+        self.player.newPlayer(" ".join(opponent) or None)
+        return "OK %s" % self.player.getName()
+
+    def cmdRound(self, received):
+        self.requirePlayer().newRound()
+        return "OK"
+
+    def cmdDeploy(self, received):
+        player = self.requirePlayer()
+        def deploy():
+            return match.checkFleet(copy.deepcopy(player.deployFleet()))
+        return self.offload(received, deploy, lambda cells: "FLEET " + " ".join(
+            "%d,%d" % cell for cell in sorted(cells)))
+
+    def cmdMove(self, received):
+        player = self.requirePlayer()
+        return self.offload(received, player.chooseMove,
+                            lambda move: "MOVE %d %d" % (move[0], move[1]))
+
+    def cmdOutcome(self, received, outcome=None, row=None, col=None):
+        if outcome not in OUTCOMES or col is None:
+            raise ProtocolError("usage: OUTCOME HIT|MISSED row col")
+        row, col = self.parseCell(row, col)
+        self.requirePlayer().setOutcome(OUTCOMES[outcome], row, col)
+        return "OK"
+
+    def cmdOpponent(self, received, row=None, col=None):
+        if col is None:
+            raise ProtocolError("usage: OPPONENT row col")
+        row, col = self.parseCell(row, col)
+        result = self.requirePlayer().getOpponentMove(row, col)
+        return OUTCOME_NAMES.get(result, str(result))
+
+    def cmdStats(self, received):
+        stats = self.latency.summary()
+        stats.update(self.server.stats())
+        return "STATS " + " ".join("%s=%s" % (key, ("%.3f" % value) if isinstance(value, float)
+                                               else value) for key, value in stats.items())
+
+    def cmdQuit(self, received):
+        self._requests.clear()
+        self.reply("BYE", received)
+        self.close_when_done()
+        return None
+
+    ###### Connection ######
+
+    def closePlayer(self):
+        if self.player is not None:
+            match.closePlayers([self.player])
+        self.player = None
+
+    def handle_close(self):
+        self.close()
+
+    def close(self):
+        self.server.connectionClosed(self)
+        if not self.pending:
+            self.closePlayer()
+        asynchat.async_chat.close(self)
+
+class Server(asyncore.dispatcher):
+    """
+    Listens for connections and keeps totals over all of them.
+
+    Keyword arguments:
+    address -- (host, port) for TCP, or a path for a Unix socket
+    modules -- names of the player modules clients may ask for
+    pool -- WorkerPool to run DEPLOY and MOVE on
+    log_dir -- directory for players that keep a gamelog to write it to
+               (default: None, for no logs)
+    """
+
+    def __init__(self, address, modules, pool, log_dir=None):
+        asyncore.dispatcher.__init__(self)
+        self.modules = list(modules)
+        self.pool = pool
+        self.log_dir = log_dir
+        self.connections = set()
+        self.finished = Latency() # Of connections that have closed
+        self.accepted = 0
+        if isinstance(address, basestring):
+            if os.path.exists(address):
+                os.unlink(address)
+            self.create_socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.set_reuse_addr()
+        self.bind(address)
+        self.listen(128)
+        self.address = self.socket.getsockname()
+
+    def handle_accept(self):
+        pair = self.accept()
+        if pair is not None:
+            self.connections.add(Connection(pair[0], self))
+            self.accepted += 1
+
+    def connectionClosed(self, connection):
+        if connection in self.connections:
+            self.connections.discard(connection)
+            self.finished.merge(connection.latency)
+
+    def stats(self):
+        """
+        Get the state of the whole server: connections open and ever
+        accepted, jobs waiting for a worker and being run, and the latency
+        over every request so far.
+        """
+        total = Latency()
+        total.merge(self.finished)
+        for connection in self.connections:
+            total.merge(connection.latency)
+        stats = collections.OrderedDict([
+            ("connections", len(self.connections)),
+            ("accepted", self.accepted),
+            ("queued", self.pool.queued),
+            ("running", self.pool.running),
+            ("workers", self.pool.workers),
+        ])
+        for key, value in total.summary().items():
+            stats["all_" + key] = value
+        return stats
+
+def serve(server, report=None, out=sys.stderr):
+    """
+    Run the event loop for ever, writing server.stats() to out every
+    report seconds (or never, for None).
+    """
+    next_report = time.time() + report if report else None
+    while True:
+        asyncore.loop(timeout=1.0, count=1)
+        if next_report is not None and time.time() >= next_report:
+            out.write(" ".join("%s=%s" % item for item in server.stats().items()) + "\n")
+            out.flush()
+            next_report += report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve players over a line protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7000)
+    parser.add_argument("--unix", default=None, metavar="PATH",
+                        help="listen on a Unix socket at PATH instead")
+    parser.add_argument("--modules", nargs="+", default=["dominus"],
+                        help="player modules clients may ask for")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=64,
+                        help="requests waiting for a worker before the server answers busy")
+    parser.add_argument("--report", type=float, default=None, metavar="SECONDS",
+                        help="print server stats every SECONDS")
+    parser.add_argument("--log-dir", default=None,
+                        help="write a gamelog of every match to this directory")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        importlib.import_module(module)
+    pool = WorkerPool(args.workers, args.max_queue)
+    server = Server(args.unix or (args.host, args.port), args.modules, pool, args.log_dir)
+    sys.stderr.write("listening on %s\n" % (server.address,))
+    try:
+        serve(server, args.report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Stand-in for BlottleshipsManager's base_player.py, for running games
+# without the manager.
+
+import const
+
+class BasePlayer(object):
+    def __init__(self):
+        self._playerName = "Unknown"
+        self._playerYear = "1"
+        self._version = "1.0"
+        self._playerDescription = "Basic player"
+        self._playerBoard = []
+        self._opponenBoard = []
+        self._initBoards()
+
+    def getName(self):
+        return self._playerName
+
+    def getYear(self):
+        return self._playerYear
+
+    def getVersion(self):
+        return self._version
+
+    def getDescription(self):
+        return self._playerDescription
+
+    def _initBoards(self):
+        """
+        Both boards are 12 rows; the first 6 are 6 cells wide and the rest
+        12 cells wide.
+        """
+        self._playerBoard = [[const.EMPTY] * (6 if row < 6 else 12) for row in range(12)]
+        self._opponenBoard = [[const.EMPTY] * (6 if row < 6 else 12) for row in range(12)]
+
+    def deployFleet(self):
+        """
+        Place the fleet on _playerBoard and return it.
+        """
+        raise NotImplementedError
+
+    def chooseMove(self):
+        """
+        Return the (row, col) to shoot at next.
+        """
+        raise NotImplementedError
+
+    def setOutcome(self, entry, row, col):
+        """
+        Record the outcome (const.HIT or const.MISSED) of our last shot.
+        """
+        if entry not in (const.HIT, const.MISSED):
+            raise Exception("Invalid input!")
+        self._opponenBoard[row][col] = entry
+
+    def getOpponentMove(self, row, col):
+        """
+        Record a shot from the opponent and return its outcome.
+        """
+        if self._playerBoard[row][col] in (const.OCCUPIED, const.HIT):
+            self._playerBoard[row][col] = const.HIT
+            return const.HIT
+        return const.MISSED
+
+    def newRound(self):
+        self._initBoards()
+
+    def newPlayer(self, name=None):
+        pass
@@ -0,0 +1,15 @@
+# Stand-in for BlottleshipsManager's const.py, for running games without
+# the manager. Only the names the players use are defined.
+
+# Cell states
+EMPTY = 0
+OCCUPIED = 1
+MISSED = 2
+HIT = 3
+
+# Ship types
+CARRIER = 0
+HOVERCRAFT = 1
+BATTLESHIP = 2
+CRUISER = 3
+DESTROYER = 4
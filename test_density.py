@@ -0,0 +1,91 @@
+"""
+The density map's incremental bookkeeping against counting from scratch,
+and the two counting kernels against each other.
+
+Usage: python -m unittest test_density
+"""
+import random
+import unittest
+
+import match # Sets up const and base_player when the manager isn't around
+import density
+import placements
+
+# One table crediting the cells a placement occupies, one crediting pivots
+TABLES = (match.loadPlayer("dominus").densityTable(),
+          match.loadPlayer("dominusFloodFill").densityTable())
+
+def shotSequences(games, seed):
+    """
+    Generator for every cell of the board in a random order, once per game.
+    """
+    rng = random.Random(seed)
+    for _ in range(games):
+        cells = list(placements.CELLS)
+        rng.shuffle(cells)
+        yield cells
+
+class IncrementalTest(unittest.TestCase):
+
+    def checkAgainstRecount(self, dmap):
+        live, counts = density._countPython(dmap.table, set(dmap.shipTypes), dmap.filled)
+        self.assertEqual(dmap.live, live)
+        self.assertEqual(list(dmap.counts), counts)
+        self.assertEqual(dmap.best(), density.best(counts))
+
+    def testShotsMatchRecount(self):
+        for table in TABLES:
+            for cells in shotSequences(4, 2):
+                dmap = density.DensityMap(table, table.shipTypes)
+                for cell in cells:
+                    dmap.shoot(cell)
+                    self.checkAgainstRecount(dmap)
+
+    def testShipTypesMatchRecount(self):
+        rng = random.Random(3)
+        for table in TABLES:
+            for cells in shotSequences(4, 3):
+                dmap = density.DensityMap(table, table.shipTypes)
+                for i, cell in enumerate(cells[:60]):
+                    dmap.shoot(cell)
+                    if i % 15 == 5 and len(dmap.shipTypes) > 1:
+                        dmap.removeShipType(rng.choice(sorted(dmap.shipTypes)))
+                    elif i % 15 == 12:
+                        dmap.setShipTypes(table.shipTypes)
+                    self.checkAgainstRecount(dmap)
+
+@unittest.skipIf(density.numpy is None, "NumPy isn't installed")
+class KernelTest(unittest.TestCase):
+
+    def testKernelsAgree(self):
+        rng = random.Random(5)
+        for table in TABLES:
+            for cells in shotSequences(6, 5):
+                shipTypes = set(rng.sample(table.shipTypes, rng.randint(1, len(table.shipTypes))))
+                filled = 0
+                for cell in cells[:90]:
+                    filled |= placements.CELL_BIT[cell]
+                    expected = density._countPython(table, shipTypes, filled)
+                    actual = density._countNumpy(table, shipTypes, filled)
+                    self.assertEqual(actual, expected)
+                    self.assertEqual(density.best(actual[1]), density.best(expected[1]))
+
+class WeightedBestTest(unittest.TestCase):
+
+    def testMatchesScoringEveryCell(self):
+        table = TABLES[0]
+        rng = random.Random(1)
+        for cells in shotSequences(20, 1):
+            weights = [rng.choice((0.5, 1.0, 1.0, 1.25, 3 * rng.random()))
+                       for _ in placements.CELLS]
+            dmap = density.DensityMap(table, table.shipTypes)
+            for cell in cells:
+                dmap.shoot(cell)
+                scores = [count * weight for count, weight in zip(dmap.counts, weights)]
+                best = max(scores)
+                expected = (best, [c for c, score in zip(placements.CELLS, scores)
+                                   if score == best]) if best else (0, [])
+                self.assertEqual(dmap.weightedBest(weights), expected)
+
+if __name__ == "__main__":
+    unittest.main()
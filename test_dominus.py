@@ -0,0 +1,40 @@
+"""
+dominus's record of each opponent from match to match.
+
+Usage: python -m unittest test_dominus
+"""
+import random
+import unittest
+
+import match # Sets up const and base_player when the manager isn't around
+import dominus
+
+class HeatMapTest(unittest.TestCase):
+
+    def testLastRoundGoesToItsOwnOpponent(self):
+        random.seed(2)
+        player, opponent = dominus.getPlayer(), match.loadPlayer("Straw1")
+        player.newPlayer("heat test A")
+        opponent.newPlayer("heat test")
+        for first in (0, 1, 0):
+            match.playRound([player, opponent], first)
+        heat_a = player.heat
+        player.newPlayer("heat test B")
+        player.newRound()
+        self.assertEqual(heat_a.rounds, 3)
+        self.assertEqual(player.heat.rounds, 0)
+        self.assertEqual(sum(player.heat.counts), 0)
+
+    def testCloseRecordsLastRound(self):
+        random.seed(3)
+        player, opponent = dominus.getPlayer(), match.loadPlayer("Straw1")
+        player.newPlayer("heat test C")
+        opponent.newPlayer("heat test")
+        match.playRound([player, opponent], 0)
+        player.close()
+        self.assertEqual(player.heat.rounds, 1)
+        player.close()
+        self.assertEqual(player.heat.rounds, 1)
+
+if __name__ == "__main__":
+    unittest.main()
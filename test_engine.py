@@ -0,0 +1,85 @@
+"""
+Every engine target policy, in players on either fleet encoding.
+
+Usage: python -m unittest test_engine
+"""
+import random
+import unittest
+
+import match # Sets up const and base_player when the manager isn't around
+import const
+import engine
+import geometry
+import placements
+
+TARGETS = (engine.adjacentTarget, engine.borderTarget, engine.floodTarget,
+           engine.singleShipTarget, engine.multiShipTarget, engine.exactCoverTarget)
+
+class FleetPlayer(engine.Player):
+    FULL_FLEET = engine.FLEET
+    getRotationFactor = staticmethod(geometry.rotate)
+    density_table = engine.PLACEMENT_DENSITY
+    hunts = (engine.densityHunt, engine.parityHunt)
+
+class VariantPlayer(engine.Player):
+    density_table = engine.PIVOT_DENSITY
+    hunts = (engine.densityHunt, engine.parityHunt)
+
+def withTarget(base, target):
+    return type(base.__name__, (base,), {"targets": (target,)})
+
+class TargetPolicyTest(unittest.TestCase):
+
+    def checkMove(self, player, move):
+        if move is not None:
+            self.assertTrue(geometry.isValidCell(tuple(move)))
+            self.assertEqual(player._opponenBoard[move[0]][move[1]], const.EMPTY)
+
+    def checkPolicies(self, base):
+        for target in TARGETS:
+            # Part way through a round, with an L of hits to work on
+            rng = random.Random(0)
+            player = withTarget(base, target)()
+            player.newPlayer("test")
+            player.newRound()
+            player.deployFleet()
+            for cell in rng.sample(placements.CELLS, 20):
+                player.setOutcome(const.MISSED, cell[0], cell[1])
+            for cell in ((8, 4), (8, 5), (8, 6), (9, 6)):
+                if player._opponenBoard[cell[0]][cell[1]] == const.EMPTY:
+                    player.setOutcome(const.HIT, cell[0], cell[1])
+            self.checkMove(player, target(player))
+            self.checkMove(player, player.chooseMove())
+
+            # And whole rounds, against a player that fires back
+            random.seed(1)
+            players = [withTarget(base, target)(), match.loadPlayer("dominusAdjacent")]
+            for p in players:
+                p.newPlayer("test")
+            for first in (0, 1):
+                result = match.playRound(players, first)
+                self.assertIsNotNone(result.winner)
+
+    def testFleetPlayer(self):
+        self.checkPolicies(FleetPlayer)
+
+    def testVariantPlayer(self):
+        self.checkPolicies(VariantPlayer)
+
+    def testCoverMatchesFleetEncoding(self):
+        # The same ships, either way round, score the same border cells
+        for base in (FleetPlayer, VariantPlayer):
+            player = base()
+            player.newRound()
+            player.deployFleet()
+            for cell in ((8, 4), (8, 5)):
+                player.setOutcome(const.HIT, cell[0], cell[1])
+            region = {(8, 4), (8, 5)}
+            border = engine.regionBorder(player, region)
+            self.assertIn(player.coverWithSingleShip(region, border), border)
+            self.assertIn(player.coverWithMultipleShips(region, border), border)
+            tiling, = player.analyzeHitRegion(region, player.shapes)
+            self.assertTrue(all(ship in player.shapes for ship in tiling))
+
+if __name__ == "__main__":
+    unittest.main()
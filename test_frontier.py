@@ -0,0 +1,41 @@
+"""
+The flood frontier built part way through a round against one kept up
+to date from the first shot.
+
+Usage: python -m unittest test_frontier
+"""
+import random
+import unittest
+
+import match # Sets up const and base_player when the manager isn't around
+import const
+import frontier
+import placements
+
+class FromBoardTest(unittest.TestCase):
+
+    def checkPriority(self, priority):
+        rng = random.Random(4)
+        for _ in range(30):
+            cells = list(placements.CELLS)
+            rng.shuffle(cells)
+            board = [[const.EMPTY] * 12 for _ in range(12)]
+            moves = []
+            live = frontier.Frontier(priority)
+            for cell in cells[:rng.randint(5, 60)]:
+                outcome = const.HIT if rng.random() < 0.3 else const.MISSED
+                board[cell[0]][cell[1]] = outcome
+                moves.append((cell, outcome))
+                live.shoot(cell, outcome == const.HIT)
+            built = frontier.Frontier.fromBoard(board, priority, moves=moves)
+            self.assertEqual([live.pop() for _ in range(len(live))],
+                             [built.pop() for _ in range(len(built))])
+
+    def testBoardOrder(self):
+        self.checkPriority(frontier.boardOrder)
+
+    def testRecencyReplaysShotOrder(self):
+        self.checkPriority(frontier.recency)
+
+if __name__ == "__main__":
+    unittest.main()
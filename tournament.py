@@ -0,0 +1,132 @@
+"""
+Round-robin tournament between player modules, sharded over a process pool.
+
+Every game is one round between freshly made players, seeded from the
+tournament seed, the two module names and the game's number within the
+pairing. Wall-clock limits in the players are switched off unless --timed
+is given, so any game can be replayed exactly with --replay.
+
+Usage: python tournament.py dominus dominusWallpaper Straw1 --games 1000 --seed 1
+"""
+import argparse
+import collections
+import hashlib
+import itertools
+import multiprocessing
+import random
+import time
+import traceback
+
+import match
+
+Game = collections.namedtuple("Game", ["index", "playerA", "playerB", "number", "seed", "first"])
+GameResult = collections.namedtuple("GameResult",
+                                    ["game", "winner", "moves", "hits", "seconds", "error"])
+
+# Attributes of players that limit their thinking by wall-clock time
+TIME_LIMITS = ("move_deadline", "panic_time_budget")
+
+def gameSeed(seed, player_a, player_b, number):
+    """
+    Derive the seed of one game. It only depends on its arguments, so
+    adding players to a tournament doesn't change the other games.
+    """
+    digest = hashlib.sha1("%s:%s:%s:%d" % (seed, player_a, player_b, number)).hexdigest()
+    return int(digest[:16], 16)
+
+def schedule(modules, games, seed):
+    """
+    Get every game of a round-robin tournament, each pairing playing
+    games games with the first shooter alternating.
+    """
+    schedule = []
+    for player_a, player_b in itertools.combinations(modules, 2):
+        for number in range(games):
+            schedule.append(Game(len(schedule), player_a, player_b, number,
+                                 gameSeed(seed, player_a, player_b, number), number % 2))
+    return schedule
+
+def playGame(game, timed=False):
+    """
+    Play one game and get its GameResult. Errors raised by either player
+    are caught and reported in the result rather than stopping the tournament.
+    """
+    start = time.time()
+    players = []
+    try:
+        random.seed(game.seed)
+        players = [match.loadPlayer(game.playerA), match.loadPlayer(game.playerB)]
+        for i, player in enumerate(players):
+            # Players with a generator of their own don't depend on random at all
+            if hasattr(player, "seedRandom"):
+                player.seedRandom(gameSeed(game.seed, game.playerA, game.playerB, i))
+        if not timed:
+            for player in players:
+                for name in TIME_LIMITS:
+                    if hasattr(player, name):
+                        setattr(player, name, None)
+        players[0].newPlayer(players[1].getName())
+        players[1].newPlayer(players[0].getName())
+        result = match.playRound(players, game.first)
+    except Exception:
+        return GameResult(game, None, None, None, time.time() - start, traceback.format_exc())
+    finally:
+        match.closePlayers(players)
+    return GameResult(game, result.winner, result.moves, result.hits, time.time() - start, None)
+
+def _playGame(args):
+    return playGame(*args)
+
+def run(games, processes=None, timed=False):
+    """
+    Generator for the GameResults of a list of games, played over a pool
+    of processes (default: one per core) and yielded as they finish.
+    """
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(_playGame, ((game, timed) for game in games)):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play a round-robin tournament between bots.")
+    parser.add_argument("modules", nargs="+")
+    parser.add_argument("--games", type=int, default=100, help="games per pairing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--timed", action="store_true", help="keep the players' time limits")
+    parser.add_argument("--replay", type=int, default=None, metavar="INDEX",
+                        help="play a single game of the schedule in this process")
+    args = parser.parse_args(argv)
+
+    games = schedule(args.modules, args.games, args.seed)
+    if args.replay is not None:
+        results = [playGame(games[args.replay], args.timed)]
+    else:
+        results = run(games, args.processes, args.timed)
+
+    wins = collections.Counter()
+    played = collections.Counter()
+    for result in results:
+        game = result.game
+        if result.error is not None:
+            winner = "error"
+            print result.error.rstrip()
+        elif result.winner is None:
+            winner = "draw"
+        else:
+            winner = (game.playerA, game.playerB)[result.winner]
+            wins[winner] += 1
+        played[game.playerA] += 1
+        played[game.playerB] += 1
+        print "%d\t%s\t%s\t%d\t%s\t%.3f" % (game.index, game.playerA, game.playerB,
+                                            game.seed, winner, result.seconds)
+
+    for module in args.modules:
+        print "%s: %d/%d" % (module, wins[module], played[module])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Zobrist hashing of board and fleet state, and a bounded cache to use the
+hashes with.
+
+Every (cell, value) pair and every ship type has a fixed random 64-bit key,
+and a state hashes to the XOR of the keys of what is in it, so a change to
+one cell or ship only has to XOR one key in or out. Keys are derived from
+the cell, value or ship type itself rather than drawn from the random
+module, so they are the same in every process and drawing them doesn't
+disturb anyone's random numbers.
+"""
+import collections
+import hashlib
+import threading
+
+MASK = (1 << 64) - 1
+
+# Returned by LRUCache.get for a key it doesn't hold
+MISSING = object()
+
+_keys = {}
+
+def key(*parts):
+    """
+    Get the 64-bit key for parts, which must have a stable repr.
+    """
+    try:
+        return _keys[parts]
+    except KeyError:
+        value = _keys[parts] = int(hashlib.md5(repr(parts)).hexdigest()[:16], 16)
+        return value
+
+def cellKey(cell, value):
+    """
+    Get the key of cell holding value (a const value). None stands for an
+    empty cell, which has no key, so an empty board hashes to 0.
+    """
+    if value is None:
+        return 0
+    return key("cell", cell, value)
+
+def shipKey(shipType):
+    return key("ship", shipType)
+
+def shotKey(cell):
+    """
+    Get the key of cell having been shot, whatever the outcome.
+    """
+    return key("shot", cell)
+
+def mix(h):
+    """
+    Scramble a 64-bit hash (the splitmix64 finaliser), so that hashes of
+    sets can themselves be XORed together without cancelling out.
+    """
+    h = ((h ^ (h >> 30)) * 0xbf58476d1ce4e5b9) & MASK
+    h = ((h ^ (h >> 27)) * 0x94d049bb133111eb) & MASK
+    return h ^ (h >> 31)
+
+def fleetHash(shipTypes):
+    h = 0
+    for shipType in shipTypes:
+        h ^= shipKey(shipType)
+    return h
+
+def regionsHash(regions):
+    """
+    Get the hash of a list of hit regions (collections of cells), which
+    depends on how the cells are grouped and on the order of the regions.
+    """
+    h = 0
+    for i, region in enumerate(regions):
+        r = 0
+        for cell in region:
+            r ^= key("region", cell)
+        h ^= mix(r ^ key("regionIndex", i))
+    return h
+
+class LRUCache(object):
+    """
+    Dict-like cache holding the maxsize most recently used entries.
+
+    Each entry can carry a check value, compared on every get, so that a
+    hash collision between two states is a miss rather than a wrong answer.
+    Safe to share between threads.
+
+    Keyword arguments:
+    maxsize -- most entries to hold
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, check=None):
+        """
+        Get the value stored under key with an equal check, or MISSING.
+        """
+        with self._lock:
+            try:
+                stored_check, value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return MISSING
+            self._entries[key] = stored_check, value
+            if stored_check != check:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            return value
+
+    def put(self, key, value, check=None):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = check, value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}